@@ -6,6 +6,7 @@ Created on 17 sept. 13:20 2020
 
 class Action:
 
+    __slots__ = ()
 
     def get_action_as_dict(self):
         raise NotImplementedError
\ No newline at end of file
@@ -9,16 +9,34 @@ from .utils import BoardStateGenerator as BSG
 from core import Color
 import numpy as np
 
+COLORS = {color.value: color for color in Color}
 
-# TODO: Update when moving to numpy
 
 class Board(object):
 
     def __init__(self, board_shape, max_per_cell=1):
 
         self.board_shape = board_shape
+        # The cells hold the Color values, Color objects are only built by the getters.
         self._board_state = BSG.generate_empty_board(board_shape)
         self.max_per_cell = max_per_cell
+        # Kept up to date by fill_cell and empty_cell so that the getters never rescan the board.
+        self._pieces = {color: set() for color in Color if color != Color.empty}
+        self._empty_cells = {(i, j) for i in range(board_shape[0]) for j in range(board_shape[1])}
+
+    def __deepcopy__(self, memo):
+        # Copying the array and the sets directly is much cheaper than walking them: they only hold ints and tuples.
+        board = self.__class__.__new__(self.__class__)
+        board.__dict__.update(self.__dict__)
+        board._board_state = self._board_state.copy()
+        board._pieces = {color: set(cells) for color, cells in self._pieces.items()}
+        board._empty_cells = set(self._empty_cells)
+        memo[id(self)] = board
+        return board
+
+    def __copy__(self):
+        # A board shares nothing with its copies, which are changed in place by the rules.
+        return self.__deepcopy__({})
 
     def get_board_state(self):
         return self._board_state
@@ -41,7 +59,11 @@ class Board(object):
             cell ((int, int)): The coordinates of the cell we want to empty.
         """
         if self.is_cell_on_board(cell):
-            self._board_state[cell] = Color.empty
+            value = int(self._board_state[cell])
+            if value != Color.empty.value:
+                self._pieces[COLORS[value]].discard(cell)
+                self._empty_cells.add(cell)
+            self._board_state[cell] = Color.empty.value
 
     def get_cell_color(self, cell: (int, int)):
         """Give the color of a cell on the board.
@@ -53,27 +75,44 @@ class Board(object):
             color (Color): The color of the cell.
         """
         if self.is_cell_on_board(cell):
-            return self._board_state[cell]
+            return COLORS[int(self._board_state[cell])]
 
     def is_empty_cell(self, cell: (int, int)):
-        return self.is_cell_on_board(cell) and self._board_state[cell] == Color.empty
+        return cell in self._empty_cells
 
     def get_all_empty_cells(self):
-        return [tuple(cell) for cell in np.argwhere(self._board_state == Color.empty)]
+        """Give the empty cells of the board.
+
+        Returns:
+            Set[(int, int)]: The empty cells. This set is updated in place when the board changes, do not modify it.
+        """
+        return self._empty_cells
 
     def fill_cell(self, cell: (int, int), color):
         if self.is_empty_cell(cell):
-            self._board_state[cell] = color
+            self._board_state[cell] = color.value
+            if color != Color.empty:
+                self._empty_cells.discard(cell)
+                self._pieces[color].add(cell)
 
     def get_player_pieces_on_board(self, color):
+        """Give the cells holding the pieces of a color.
+
+        Args:
+            color (Color): The color of the pieces.
+
+        Returns:
+            Set[(int, int)]: The cells of the pieces. This set is updated in place when the board changes, do not
+            modify it. Use sorted() to walk it row by row.
+        """
         assert isinstance(color, Color), "Color need to be a valid Color object"
-        return [tuple(cell) for cell in np.argwhere(self._board_state == color)]
+        if color == Color.empty:
+            return self._empty_cells
+        return self._pieces[color]
 
     def get_json_board(self):
-        def color_name(x):
-            return x.name
-        name = np.vectorize(color_name)
-        return name(self._board_state).tolist()
+        names = np.array([COLORS[value].name for value in (-1, 0, 1)])
+        return names[self._board_state + 1].tolist()
 
     def is_center(self, cell: (int, int)):
         return cell == (self.board_shape[0] // 2, self.board_shape[1] // 2)
@@ -82,6 +121,6 @@ class Board(object):
         pass
 
     def get_all_empty_cells_without_center(self):
-        return [tuple(cell) for cell in np.argwhere(self._board_state == Color.empty) if tuple(cell) != (self.board_shape[0] // 2, self.board_shape[0] //2)]
+        return [cell for cell in sorted(self._empty_cells) if cell != (self.board_shape[0] // 2, self.board_shape[0] //2)]
 
         
\ No newline at end of file
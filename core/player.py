@@ -49,3 +49,8 @@ class Player(object):
     def reset_player_informations(self):
         self.on_board = 22
         self.score = 0
+
+    def stop_pondering(self):
+        """Stop any search the player runs in the background. The game runner calls it when a game ends and before
+        a new one starts. Does nothing by default."""
+        pass
@@ -6,12 +6,11 @@ Created on 16 sept. 16:51 2020
 import numpy as np
 
 from typing import List
-from core import Color
 
 
 class BoardStateGenerator(object):
 
     @staticmethod
-    def generate_empty_board(board_shape: (int, int)) -> np.ndarray : # TODO : Do I use numpy or lists ?
-
-        return np.asarray([[Color.empty for _ in range(board_shape[1])] for _ in range(board_shape[0])])
\ No newline at end of file
+    def generate_empty_board(board_shape: (int, int)) -> np.ndarray :
+        """Give an empty board: a contiguous int8 array holding the Color values (-1, 0 or 1) of the cells."""
+        return np.zeros(board_shape, dtype=np.int8)
\ No newline at end of file
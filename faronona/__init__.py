@@ -5,4 +5,5 @@ Created on 16 sept. 15:52 2020
 """
 from faronona.faronona_rules import FarononaRules
 from faronona.faronona_state import FarononaState
-from faronona.faronona_action import FarononaAction
+from faronona.faronona_action import FarononaAction, FarononaActionSpace, get_action_space
+from faronona.faronona_eval import FarononaEvaluator
@@ -0,0 +1,3 @@
+"""Alpha-Beta Search Agent implementation."""
+
+from .search import AlphaBetaSearch
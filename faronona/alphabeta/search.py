@@ -0,0 +1,218 @@
+"""Negamax search with alpha-beta pruning and iterative deepening."""
+
+import time
+from copy import deepcopy
+from faronona.faronona_action import FarononaAction
+from faronona.faronona_eval import FarononaEvaluator
+from faronona.faronona_rules import FarononaRules, COMBO_PLAYERS
+from faronona.faronona_state import FarononaState
+
+# Value of a won game, to which the final score difference is added. Far above any evaluation.
+WIN_VALUE = 10000
+# Values beyond this one are won or lost games, whatever their distance.
+WIN_BOUND = WIN_VALUE // 2
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def to_table_value(value, ply):
+    """Make the value of a won or lost game relative to the node instead of the root, to store it in the table."""
+    if value >= WIN_BOUND:
+        return value + ply
+    if value <= -WIN_BOUND:
+        return value - ply
+    return value
+
+
+def from_table_value(value, ply):
+    """Make the value of a won or lost game read from the table relative to the root again."""
+    if value >= WIN_BOUND:
+        return value - ply
+    if value <= -WIN_BOUND:
+        return value + ply
+    return value
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the deadline is passed."""
+
+
+class AlphaBetaSearch(object):
+    """Alpha-beta entry point.
+
+    The moves are made in place on a copy of the state with FarononaRules.make_move and undone on the way back. A
+    capture continuing a combo is a ply of the same player: its value is not negated and the window is kept. The
+    moves are ordered by the move of the transposition table, then the captures by number of pieces captured, then
+    the killer moves of the ply and the history heuristic.
+
+    The table holds the won and lost games with their distance from the stored node, not from the root. The
+    position hash only gives the bucket of boring moves, so the table is neither read nor written for the values of
+    the nodes from which the search can reach the draw by boring moves.
+    """
+
+    def __init__(self, evaluator: FarononaEvaluator = None, max_depth: int = 64, table_size: int = 200000,
+                 tablebase=None) -> None:
+        """Initializer for search.
+
+        Args:
+            evaluator (FarononaEvaluator): Scores the positions at the depth limit. Defaults to a FarononaEvaluator
+                                           with its default weights.
+            max_depth (int): Deepest iteration. Defaults to 64.
+            table_size (int): Number of positions kept in the transposition table, which is cleared when full.
+                              Defaults to 200000.
+            tablebase (EndgameTablebase): If given, the positions of the table get their exact value instead of
+                                          being searched. Defaults to None.
+        """
+        self.evaluator = evaluator if evaluator is not None else FarononaEvaluator()
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self.tablebase = tablebase
+        self.table = {}  # position hash -> (depth, value, bound, best action code), kept from one move to the next
+        self.history = {}  # action code -> history score
+        self.killers = []
+        self.nodes = 0
+        self.depth_reached = 0
+        self.deadline = None
+
+    def best_action(self, state: FarononaState, time_limit: float = None, depth: int = None) -> FarononaAction:
+        """Search deeper and deeper until the time limit and give the best action of the deepest completed search.
+
+        Args:
+            state (FarononaState): The state to play, not modified.
+            time_limit (float, optional): Seconds to search. The first iteration always completes. Defaults to None.
+            depth (int, optional): Deepest iteration, max_depth if None. Defaults to None.
+
+        Returns:
+            FarononaAction: The best action.
+        """
+        state = deepcopy(state)
+        self.deadline = time.time() + time_limit if time_limit is not None else None
+        self.killers = [[None, None] for _ in range(2 * self.max_depth + 1)]
+        self.history = {}
+        self.nodes = 0
+        self.depth_reached = 0
+        best = None
+        for iteration in range(1, (depth or self.max_depth) + 1):
+            try:
+                value, action = self._search_root(state, iteration)
+            except SearchTimeout:
+                break
+            best, self.depth_reached = action, iteration
+            if abs(value) >= WIN_VALUE - 2 * self.max_depth:
+                # The game is solved from here.
+                break
+        return best
+
+    def _search_root(self, state, depth):
+        player = state.get_next_player()
+        alpha, beta = -float('inf'), float('inf')
+        best_value, best_action = -float('inf'), None
+        for action, captured in self._ordered_actions(state, player, 0, self._table_move(state)):
+            value = self._search_child(state, action, player, depth, alpha, beta, 1)
+            if value > best_value:
+                best_value, best_action = value, action
+            alpha = max(alpha, value)
+        self._store(state, depth, best_value, EXACT, best_action, 0)
+        return best_value, best_action
+
+    def _search_child(self, state, action, player, depth, alpha, beta, ply):
+        """Play an action and give its value for the player."""
+        undo = FarononaRules.make_move(state, action, player)
+        try:
+            FarononaRules.moment_player(state, COMBO_PLAYERS)
+            if state.get_next_player() == player:
+                return self._negamax(state, depth - 1, alpha, beta, ply)
+            return -self._negamax(state, depth - 1, -beta, -alpha, ply)
+        finally:
+            FarononaRules.unmake_move(state, undo)
+
+    def _negamax(self, state, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.deadline is not None and self.depth_reached and self.nodes & 1023 == 0 \
+                and time.time() > self.deadline:
+            raise SearchTimeout()
+        player = state.get_next_player()
+        if FarononaRules.is_end_game(state):
+            difference = state.score[player] - state.score[player * -1]
+            if difference == 0:
+                return 0
+            # Prefer the quickest wins and the slowest losses.
+            return difference + (WIN_VALUE - ply if difference > 0 else ply - WIN_VALUE)
+        if self.tablebase is not None:
+            exact = self.tablebase.probe(state)
+            if exact is not None:
+                value, distance = exact
+                return value * (WIN_VALUE - ply - distance)
+        if depth <= 0:
+            return self.evaluator.evaluate(state, player)
+
+        entry = self.table.get(state.get_hash())
+        table_move = None
+        if entry is not None:
+            entry_depth, value, bound, table_move = entry
+            if entry_depth >= depth and not self._reaches_boring_limit(state, depth):
+                value = from_table_value(value, ply)
+                if bound == EXACT:
+                    return value
+                if bound == LOWER:
+                    alpha = max(alpha, value)
+                elif bound == UPPER:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        original_alpha = alpha
+        best_value, best_action = -float('inf'), None
+        for action, captured in self._ordered_actions(state, player, ply, table_move):
+            value = self._search_child(state, action, player, depth, alpha, beta, ply + 1)
+            if value > best_value:
+                best_value, best_action = value, action
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                if not captured:
+                    killers = self.killers[ply]
+                    if killers[0] is not action:
+                        killers[0], killers[1] = action, killers[0]
+                    self.history[action.code] = self.history.get(action.code, 0) + depth * depth
+                break
+
+        if best_value <= original_alpha:
+            bound = UPPER
+        elif best_value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self._store(state, depth, best_value, bound, best_action, ply)
+        return best_value
+
+    def _ordered_actions(self, state, player, ply, table_move):
+        """Give the (action, captured count) of the player, the most promising first."""
+        killers = self.killers[ply] if ply < len(self.killers) else (None, None)
+
+        def priority(scored):
+            action, captured = scored
+            if action.code == table_move:
+                return 4e9
+            if captured:
+                return 3e9 + captured
+            if action is killers[0] or action is killers[1]:
+                return 2e9
+            return self.history.get(action.code, 0)
+        return sorted(FarononaRules.get_scored_actions(state, player), key=priority, reverse=True)
+
+    def _table_move(self, state):
+        entry = self.table.get(state.get_hash())
+        return entry[3] if entry is not None else None
+
+    @staticmethod
+    def _reaches_boring_limit(state, depth):
+        """Tell if the draw by boring moves can happen within depth plies, each adding at most one boring move."""
+        return state.boring_moves + depth >= state.just_stop
+
+    def _store(self, state, depth, value, bound, action, ply):
+        if len(self.table) >= self.table_size:
+            self.table.clear()
+        if self._reaches_boring_limit(state, depth):
+            # Only the move is kept: the value depends on the exact count of boring moves, not in the hash.
+            depth, value, bound = 0, 0, EXACT
+        self.table[state.get_hash()] = (depth, to_table_value(value, ply), bound,
+                                        action.code if action is not None else None)
@@ -0,0 +1,30 @@
+import os
+from faronona.faronona_player import FarononaPlayer
+from faronona.faronona_tablebase import EndgameTablebase
+from alphabeta import AlphaBetaSearch
+from mcts import TimeManager
+
+
+class AI(FarononaPlayer):
+
+    name = "Alpha-Beta Player"
+
+    # Alpha-Beta Parameters
+    MAX_DEPTH = 64
+    TABLE_SIZE = 200000  # positions kept in the transposition table
+    TABLEBASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'endgame_tablebase.bin')  # if it exists
+
+    def __init__(self, color):
+        super(AI, self).__init__(self.name, color)
+        self.position = color.value
+        self.tablebase = EndgameTablebase(self.TABLEBASE_PATH) \
+            if self.TABLEBASE_PATH and os.path.exists(self.TABLEBASE_PATH) else None
+        self.search = AlphaBetaSearch(max_depth=self.MAX_DEPTH, table_size=self.TABLE_SIZE, tablebase=self.tablebase)
+        self.clock = TimeManager()
+
+    def play(self, state, remain_time):
+        if self.tablebase is not None:
+            action = self.tablebase.get_action(state)
+            if action is not None:
+                return action
+        return self.search.best_action(state, time_limit=self.clock.get_budget(state, remain_time))
@@ -2,6 +2,9 @@
 from core import Action
 
 from enum import Enum
+from functools import lru_cache
+
+from faronona.faronona_tables import get_board_tables
 
 
 class FarononaActionType(Enum):
@@ -10,15 +13,20 @@ class FarononaActionType(Enum):
 
 class FarononaAction(Action):
 
+    __slots__ = ('_action_type', '_action', '_win_by', '_code')
+
     def __init__(self, action_type, win_by='APPROACH', **kwargs):
         """This is the format that every action must have. Dependending of the action type additional parameters can be asked.
             Example : a move from (0, 1) to (0, 2) is equivalent to FarononaAction(action_type=FarononaActionType.MOVE, at=(0, 1), to=(0, 2))
 
+        An action cannot be modified once created: the prebuilt actions of FarononaActionSpace are shared by every
+        caller, so the dicts given by the getters are copies.
+
         Args:
             action_type (FarononaActionType): The type of the performed action.
         """
         assert isinstance(action_type, FarononaActionType), "Not a good action type format"
-        self.action_type = action_type
+        self._action_type = action_type
 
         if action_type == FarononaActionType.MOVE:
             assert ((len(kwargs) == 2) and ('to' in kwargs.keys()) and ('at' in kwargs.keys())),\
@@ -26,20 +34,96 @@ class FarononaAction(Action):
             assert isinstance(kwargs['to'], tuple) and isinstance(kwargs['at'], tuple),\
                 "to and from has to be a tuple"
 
-        self.action = kwargs 
-        self.win_by = win_by
+        self._action = kwargs
+        self._win_by = win_by
+        self._code = None
+
+    @property
+    def action_type(self):
+        return self._action_type
+
+    @property
+    def action(self):
+        return dict(self._action)
+
+    @property
+    def win_by(self):
+        return self._win_by
+
+    @property
+    def code(self):
+        """The index of the action in the FarononaActionSpace it comes from. None if it was built directly."""
+        return self._code
 
     def __repr__(self):
         return str(self.get_action_as_dict())
 
+    def __deepcopy__(self, memo):
+        return self
+
     def get_action_as_dict(self):
-        return {'action_type': self.action_type,
-                'action': self.action,
-                'winby': self.win_by}
+        return {'action_type': self._action_type, 'action': dict(self._action), 'winby': self._win_by}
 
     def get_json_action(self):
-        return {'action_type': self.action_type.name,
-                'action': self.action}
+        return {'action_type': self._action_type.name, 'action': dict(self._action)}
 
     def get_action(self):
         return self.action_type.name
+
+
+WIN_BY = ('APPROACH', 'REMOTE')
+
+
+class FarononaActionSpace(object):
+
+    def __init__(self, board_shape):
+        """The fixed integer encoding of the moves of a board shape. Each cell, direction the piece on it can move
+        along and way of capturing (APPROACH then REMOTE) gets an index, row by row, and a prebuilt action. The
+        index is (cell_move * 2 + win_by) where cell_move numbers the legal (cell, direction) pairs.
+
+        Args:
+            board_shape ((int, int)): The board shape.
+        """
+        tables = get_board_tables(board_shape)
+        self.board_shape = board_shape
+        self.actions = []
+        self._codes = {}
+        for cell in tables.cells:
+            for _, move in tables.moves[cell]:
+                for win_by in WIN_BY:
+                    action = FarononaAction(action_type=FarononaActionType.MOVE, win_by=win_by, at=cell, to=move)
+                    action._code = len(self.actions)
+                    self._codes[(cell, move, win_by)] = action._code
+                    self.actions.append(action)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def get_action(self, at, to, win_by='APPROACH'):
+        """Give the prebuilt action of a move."""
+        return self.actions[self._codes[(at, to, win_by)]]
+
+    def encode(self, action):
+        """Give the index of an action.
+
+        Args:
+            action (FarononaAction): Any action of the board shape, prebuilt or not.
+
+        Returns:
+            int: The index of the action.
+        """
+        if action.code is not None:
+            return action.code
+        return self._codes[(action.action['at'], action.action['to'], action.win_by)]
+
+    def decode(self, code):
+        """Give the prebuilt action of an index."""
+        return self.actions[code]
+
+
+@lru_cache(maxsize=None)
+def get_action_space(board_shape):
+    return FarononaActionSpace(board_shape)
@@ -0,0 +1,197 @@
+"""Bitboard backend for the Faronona board."""
+
+from functools import lru_cache
+
+from core import Board, Color
+from faronona.faronona_tables import DIRECTIONS, OPPOSITE, get_board_tables
+
+
+class BitboardTables(object):
+
+    def __init__(self, board_shape):
+        """Masks derived from the board tables. A cell (i, j) is the bit i * board_shape[1] + j.
+            - cells      : The coordinates of each bit
+            - directions : Maps a (row, column) step to its direction index
+            - moves      : For each bit, the (direction, bit) pairs a piece can move to
+            - adjacency  : For each bit, the mask of the cells a piece can move to
+            - rays       : For each bit and direction, the mask of the cells on the line starting next to it
+            - steps      : For each bit and direction, the mask of the next cell on that line, 0 off the board
+            - ascending  : For each direction, True if the ray goes towards higher bits
+
+        Args:
+            board_shape ((int, int)): The board shape.
+        """
+        tables = get_board_tables(board_shape)
+        self.board_shape = board_shape
+        self.full = (1 << len(tables.cells)) - 1
+        self.cells = tables.cells
+        self.directions = tables.direction_of
+        self.ascending = [di * board_shape[1] + dj > 0 for di, dj in DIRECTIONS]
+        self.moves = [[(d, self.index(move)) for d, move in tables.moves[cell]] for cell in self.cells]
+        self.adjacency = [sum(1 << bit for _, bit in moves) for moves in self.moves]
+        self.rays = [[self.mask_of(ray) for ray in tables.rays[cell]] for cell in self.cells]
+        self.steps = [[self.mask_of(ray[:1]) for ray in tables.rays[cell]] for cell in self.cells]
+
+    def __deepcopy__(self, memo):
+        # The tables are shared by every board of the same shape and never modified.
+        return self
+
+    def index(self, cell):
+        return cell[0] * self.board_shape[1] + cell[1]
+
+    def cells_of(self, mask, ascending=True):
+        """Give the coordinates of the cells set in a mask, ordered by bit."""
+        bits = []
+        while mask:
+            low = mask & -mask
+            bits.append(self.cells[low.bit_length() - 1])
+            mask ^= low
+        return bits if ascending else bits[::-1]
+
+    def mask_of(self, cells):
+        mask = 0
+        for cell in cells:
+            mask |= 1 << self.index(cell)
+        return mask
+
+
+@lru_cache(maxsize=None)
+def get_bitboard_tables(board_shape):
+    return BitboardTables(board_shape)
+
+
+class FarononaBitboard(Board):
+
+    def __init__(self, board_shape, max_per_cell=1):
+        """A board whose pieces are one integer bitmask per color. Moves and captures are computed with bit
+        operations on those masks, which are the only thing a move updates: the cell array and the cell sets of
+        Board are rebuilt from them when one of the getters asks for them.
+
+        Args:
+            board_shape ((int, int)): The board shape.
+            max_per_cell (int, optional): Maximum number of pieces per cell. Defaults to 1.
+        """
+        Board.__init__(self, board_shape, max_per_cell)
+        self.tables = get_bitboard_tables(tuple(board_shape))
+        self.masks = {-1: 0, 1: 0}
+        self._stale = False  # True when the array and the sets lag behind the masks
+
+    def __deepcopy__(self, memo):
+        board = Board.__deepcopy__(self, memo)
+        board.masks = dict(self.masks)
+        return board
+
+    def _sync(self):
+        """Rebuild the cell array and the cell sets from the masks."""
+        if not self._stale:
+            return
+        tables = self.tables
+        self._board_state[:] = Color.empty.value
+        # The sets are updated in place, as Board does.
+        for color, pieces in self._pieces.items():
+            cells = tables.cells_of(self.masks[color.value])
+            pieces.clear()
+            pieces.update(cells)
+            for cell in cells:
+                self._board_state[cell] = color.value
+        self._empty_cells.clear()
+        self._empty_cells.update(tables.cells_of(self.get_empty_mask()))
+        self._stale = False
+
+    def get_board_state(self):
+        self._sync()
+        return self._board_state
+
+    def empty_cell(self, cell: (int, int)):
+        if self.is_cell_on_board(cell):
+            bit = 1 << self.tables.index(cell)
+            if (self.masks[-1] | self.masks[1]) & bit:
+                self.masks[-1] &= ~bit
+                self.masks[1] &= ~bit
+                self._stale = True
+
+    def get_cell_color(self, cell: (int, int)):
+        if self.is_cell_on_board(cell):
+            bit = 1 << self.tables.index(cell)
+            if self.masks[-1] & bit:
+                return Color(-1)
+            if self.masks[1] & bit:
+                return Color(1)
+            return Color.empty
+
+    def is_empty_cell(self, cell: (int, int)):
+        return self.is_cell_on_board(cell) and not (self.masks[-1] | self.masks[1]) >> self.tables.index(cell) & 1
+
+    def get_all_empty_cells(self):
+        self._sync()
+        return self._empty_cells
+
+    def fill_cell(self, cell: (int, int), color):
+        if color != Color.empty and self.is_empty_cell(cell):
+            self.masks[color.value] |= 1 << self.tables.index(cell)
+            self._stale = True
+
+    def get_player_pieces_on_board(self, color):
+        self._sync()
+        return Board.get_player_pieces_on_board(self, color)
+
+    def get_json_board(self):
+        self._sync()
+        return Board.get_json_board(self)
+
+    def get_all_empty_cells_without_center(self):
+        self._sync()
+        return Board.get_all_empty_cells_without_center(self)
+
+    def get_empty_mask(self):
+        return self.tables.full & ~(self.masks[-1] | self.masks[1])
+
+    def get_capture_mask(self, origin, direction, opponent_mask):
+        """Give the opponent pieces lined up from the cell next to origin in the given direction.
+
+        Args:
+            origin (int): The bit of the cell the line starts from (excluded).
+            direction (int): The index of the direction in DIRECTIONS.
+            opponent_mask (int): The opponent pieces.
+
+        Returns:
+            int: The mask of the captured pieces. 0 if the next cell is not an opponent piece.
+        """
+        ray = self.tables.rays[origin][direction]
+        blockers = ray & ~opponent_mask
+        if blockers:
+            if self.tables.ascending[direction]:
+                ray &= (blockers & -blockers) - 1
+            else:
+                ray &= ~((1 << blockers.bit_length()) - 1)
+        return ray
+
+    def get_approach_mask(self, at, to, direction, player):
+        return self.get_capture_mask(to, direction, self.masks[-player])
+
+    def get_remote_mask(self, at, to, direction, player):
+        return self.get_capture_mask(at, OPPOSITE[direction], self.masks[-player])
+
+    def get_captures(self, at, to, player, approach=True):
+        """Give the pieces captured by a move, as FarononaRules.is_win_approach_move and is_win_remote_move do.
+
+        Args:
+            at ((int, int)): The coordinates of the moving piece.
+            to ((int, int)): The coordinates of the destination.
+            player (int): The number of the player making the move.
+            approach (bool, optional): True for an approach capture, False for a remote one. Defaults to True.
+
+        Returns:
+            List: The captured cells from the nearest to the farthest. None if nothing is captured.
+        """
+        direction = self.tables.directions.get((to[0] - at[0], to[1] - at[1]))
+        if direction is None:
+            return None
+        if approach:
+            mask = self.get_approach_mask(self.tables.index(at), self.tables.index(to), direction, player)
+            ascending = self.tables.ascending[direction]
+        else:
+            mask = self.get_remote_mask(self.tables.index(at), self.tables.index(to), direction, player)
+            ascending = self.tables.ascending[OPPOSITE[direction]]
+        if mask:
+            return self.tables.cells_of(mask, ascending)
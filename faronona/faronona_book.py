@@ -0,0 +1,151 @@
+"""Opening book of the Faronona positions, stored in a sorted binary file read through mmap."""
+
+import argparse
+import mmap
+import struct
+from copy import deepcopy
+
+from faronona.faronona_action import get_action_space
+from faronona.faronona_rules import FarononaRules, COMBO_PLAYERS
+
+MAGIC = b'FBOOK001'
+HEADER = struct.Struct('<8sQ')  # magic, number of entries
+ENTRY = struct.Struct('<QII')  # position hash, action code, weight
+
+
+def write_opening_book(path, entries):
+    """Write a book file.
+
+    Args:
+        path (str): The file to write.
+        entries (Iterable[(int, int, int)]): The (position hash, action code, weight) of each book move.
+    """
+    entries = sorted(entries, key=lambda entry: (entry[0], -entry[2], entry[1]))
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(entries)))
+        for entry in entries:
+            f.write(ENTRY.pack(*entry))
+
+
+class OpeningBook(object):
+
+    def __init__(self, path, board_shape=(5, 9)):
+        """A book file opened with mmap, so only the pages the lookups touch are read. The entries are sorted by
+        position hash, then by decreasing weight, and looked up with a binary search.
+
+        Args:
+            path (str): The book file, written by write_opening_book.
+            board_shape ((int, int), optional): The board shape of the book positions. Defaults to (5, 9).
+        """
+        self.space = get_action_space(board_shape)
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size = HEADER.unpack_from(self._map, 0)
+        assert magic == MAGIC, "Not an opening book file"
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        self._map.close()
+
+    def _hash_at(self, index):
+        return struct.unpack_from('<Q', self._map, HEADER.size + index * ENTRY.size)[0]
+
+    def probe(self, state):
+        """Give the book moves of a position.
+
+        Args:
+            state (FarononaState): A state object from the Faronona game.
+
+        Returns:
+            List[(FarononaAction, int)]: The legal book actions and their weights, the heaviest first.
+        """
+        position = state.get_hash()
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self._hash_at(middle) < position:
+                low = middle + 1
+            else:
+                high = middle
+        moves = []
+        legal = None
+        while low < self.size:
+            entry_hash, code, weight = ENTRY.unpack_from(self._map, HEADER.size + low * ENTRY.size)
+            if entry_hash != position:
+                break
+            if legal is None:
+                legal = [action for action, _ in FarononaRules.get_scored_actions(state, state.get_next_player())]
+            action = self.space.decode(code)
+            # A hash collision could give a move of another position.
+            if action in legal:
+                moves.append((action, weight))
+            low += 1
+        return moves
+
+    def get_action(self, state):
+        """Give the heaviest book action of a position, None if the position is not in the book."""
+        moves = self.probe(state)
+        return moves[0][0] if moves else None
+
+
+def build_opening_book(state, plies=6, width=2, n_iterations=400, search=None):
+    """Build the book entries of the positions reached from a state by the best moves of both players.
+
+    Each position is searched, its `width` most visited moves are written with their visits as weight, and the
+    positions they lead to are searched in turn until `plies` moves were played.
+
+    Args:
+        state (FarononaState): The starting position, usually the initial one. Not modified.
+        plies (int, optional): Depth of the book in moves. Defaults to 6.
+        width (int, optional): Moves kept per position. Defaults to 2.
+        n_iterations (int, optional): MCTS iterations per position. Defaults to 400.
+        search (Callable, optional): Called with a state, gives its (action, weight) pairs, the best first.
+                                     Defaults to an MCTS search of n_iterations.
+
+    Returns:
+        List[(int, int, int)]: The (position hash, action code, weight) entries.
+    """
+    from faronona.mcts import Node, Search
+
+    def mcts_search(position):
+        root = Node(position.get_next_player(), deepcopy(position))
+        Search(root).best_action(n_iterations=n_iterations)
+        ranked = sorted(zip(root.actions, root.children), key=lambda pair: -pair[1].n)
+        return [(action, int(child.n)) for action, child in ranked]
+    search = search or mcts_search
+
+    entries, seen = [], set()
+    space = get_action_space(state.get_board().board_shape)
+    frontier = [deepcopy(state)]
+    for _ in range(plies):
+        next_frontier = []
+        for position in frontier:
+            if position.get_hash() in seen:
+                continue
+            seen.add(position.get_hash())
+            for action, weight in search(position)[:width]:
+                entries.append((position.get_hash(), space.encode(action), weight))
+                child = deepcopy(position)
+                child, done = FarononaRules.act(child, action, child.get_next_player())
+                FarononaRules.moment_player(child, COMBO_PLAYERS)
+                if not done:
+                    next_frontier.append(child)
+        frontier = next_frontier
+    return entries
+
+
+if __name__ == '__main__':
+    from faronona.faronona_state import get_initial_state
+
+    parser = argparse.ArgumentParser(description='Build an opening book by searching the first moves.')
+    parser.add_argument('-o', default='opening_book.bin', help='the book file to write')
+    parser.add_argument('-p', type=int, default=6, help='number of moves covered by the book')
+    parser.add_argument('-w', type=int, default=2, help='number of moves kept per position')
+    parser.add_argument('-n', type=int, default=400, help='MCTS iterations per position')
+    args = parser.parse_args()
+
+    entries = build_opening_book(get_initial_state(), plies=args.p, width=args.w, n_iterations=args.n)
+    write_opening_book(args.o, entries)
+    print('%d book moves written to %s' % (len(entries), args.o))
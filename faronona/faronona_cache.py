@@ -0,0 +1,65 @@
+"""Cache of the rules results, keyed by the position hash."""
+
+import threading
+from collections import OrderedDict
+
+
+class PositionCache(object):
+
+    def __init__(self, max_size=10000):
+        """A bounded cache of results computed on positions. The entries are grouped by position hash and the least
+        recently used position is dropped when the cache is full.
+
+        Args:
+            max_size (int, optional): Maximum number of positions kept. Defaults to 10000.
+        """
+        self.max_size = max_size
+        self._positions = OrderedDict()
+        # The rules are called from the thread of a pondering agent too.
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._positions)
+
+    def get(self, position, key, default=None):
+        """Give a result stored for a position.
+
+        Args:
+            position (int): The hash of the position (FarononaState.get_hash).
+            key (Hashable): What was computed on the position.
+            default (optional): Returned when the result is not cached. Defaults to None.
+        """
+        with self._lock:
+            entries = self._positions.get(position)
+            if entries is not None and key in entries:
+                self.hits += 1
+                self._positions.move_to_end(position)
+                return entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, position, key, value):
+        with self._lock:
+            entries = self._positions.get(position)
+            if entries is None:
+                entries = self._positions[position] = {}
+                if len(self._positions) > self.max_size:
+                    self._positions.popitem(last=False)
+            else:
+                self._positions.move_to_end(position)
+            entries[key] = value
+
+    def invalidate(self, position=None):
+        """Drop the results of a position, or of every position if None is given."""
+        with self._lock:
+            if position is None:
+                self._positions.clear()
+            else:
+                self._positions.pop(position, None)
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.,
+                'size': len(self._positions)}
@@ -0,0 +1,68 @@
+"""Static evaluation of the Faronona positions."""
+
+from core import Color
+from faronona.faronona_rules import FarononaRules
+from faronona.faronona_tables import OPPOSITE, get_board_tables
+
+
+class FarononaEvaluator(object):
+
+    def __init__(self, material_weight=1., mobility_weight=.05, threat_weight=.5):
+        """A linear evaluation of a position in score units, computed without searching:
+            - material : The score of the player, the opponent pieces it captured so far
+            - mobility : The number of moves the player would have if it were its turn
+            - threats  : The number of opponent pieces the player could capture in one move if it were its turn
+
+        Args:
+            material_weight (float, optional): Weight of the material. Defaults to 1.
+            mobility_weight (float, optional): Weight of the mobility. Defaults to .05.
+            threat_weight (float, optional): Weight of the threatened opponent pieces. Defaults to .5.
+        """
+        self.material_weight = material_weight
+        self.mobility_weight = mobility_weight
+        self.threat_weight = threat_weight
+
+    def get_features(self, state, player):
+        """Give the material, mobility and threats of a player, see the initializer.
+
+        Args:
+            state (FarononaState): A state object from the Faronona game.
+            player (int): The number of the player.
+
+        Returns:
+            Dict[str, int]: The value of each feature.
+        """
+        board = state.get_board()
+        tables = get_board_tables(board.board_shape)
+        empty_cells = board.get_all_empty_cells()
+        opponent_pieces = board.get_player_pieces_on_board(Color(player * -1))
+        mobility = 0
+        threatened = set()
+        for piece in board.get_player_pieces_on_board(Color(player)):
+            for direction, move in tables.moves[piece]:
+                if move in empty_cells:
+                    mobility += 1
+                    for ray in (tables.rays[move][direction], tables.rays[piece][OPPOSITE[direction]]):
+                        captured = FarononaRules.get_ray_captures(ray, opponent_pieces)
+                        if captured:
+                            threatened.update(captured)
+        return {'material': state.score[player], 'mobility': mobility, 'threats': len(threatened)}
+
+    def estimate_score(self, state):
+        """Estimate the score each player would reach, to stand in for the score of a game stopped early.
+
+        Returns:
+            Dict[int, float]: The estimated score of each player.
+        """
+        estimate = {}
+        for player in (-1, 1):
+            features = self.get_features(state, player)
+            estimate[player] = (self.material_weight * features['material']
+                                + self.mobility_weight * features['mobility']
+                                + self.threat_weight * features['threats'])
+        return estimate
+
+    def evaluate(self, state, player):
+        """Give the estimated score difference in favour of a player."""
+        estimate = self.estimate_score(state)
+        return estimate[player] - estimate[player * -1]
@@ -1,11 +1,29 @@
 
+from collections import namedtuple
 from core.rules import Rule
 from core import Color, board
-from faronona.faronona_action import FarononaActionType, FarononaAction
+from faronona.faronona_action import FarononaActionType, get_action_space
+from faronona.faronona_bitboard import FarononaBitboard
+from faronona.faronona_cache import PositionCache
+from faronona.faronona_player import FarononaPlayer
+from faronona.faronona_tables import OPPOSITE, get_board_tables
+from faronona.faronona_zobrist import get_zobrist_keys
 MAX_SCORE = 22
 
+# What FarononaRules.unmake_move needs to undo a move: the move itself, the removed opponent pieces and the state
+# attributes as they were before the move.
+MoveUndo = namedtuple('MoveUndo', ['at', 'to', 'player', 'captured', 'latest_player', 'latest_move', 'next_player',
+                                   'score', 'on_board', 'boring_moves', 'rewarding_move', 'state_captured',
+                                   'winmove', 'occuped', 'occupedplayer', 'zobrist'])
+
+# Players always going on with their combos, for moment_player calls made while exploring moves.
+COMBO_PLAYERS = {-1: FarononaPlayer("-1", Color(-1)), 1: FarononaPlayer("1", Color(1))}
+
 class FarononaRules(Rule):
 
+    # Position cache of the move analysis and of the end of game status, None when disabled. See enable_cache.
+    cache = None
+
     def __init__(self, players):
         self.players = players
         self.current_player = -1 
@@ -48,12 +66,8 @@ class FarononaRules(Rule):
         """
         board = state.get_board()
         if board.is_cell_on_board(cell):
-            possibles_moves = FarononaRules.get_rules_possibles_moves(cell, board.board_shape)
-            effective_moves = []
-            for move in possibles_moves:
-                if board.is_empty_cell(move):
-                    effective_moves.append(move)
-            return effective_moves 
+            possibles_moves = get_board_tables(board.board_shape).neighbours[cell]
+            return [move for move in possibles_moves if board.is_empty_cell(move)]
 
     @staticmethod #done
     def get_rules_possibles_moves(cell, board_shape):
@@ -64,38 +78,39 @@ class FarononaRules(Rule):
             board_shape ((int, int)): The board shape.
 
         Returns:
-            List: A list containing all the coordinates where the piece could go.
+            List: A list containing all the coordinates where the piece could go, empty for a cell off the board.
         """
-        if (cell[0]%2 == 0 and cell[1]%2 == 0) or (cell[0]%2 == 1 and cell[1]%2 == 1):
-            return [(cell[0] + a[0], cell[1] + a[1])
-                for a in [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (1, -1), (-1, 1)]
-                if ((0 <= cell[0] + a[0] < board_shape[0]) and (0 <= cell[1] + a[1] < board_shape[1]))]
-        elif (cell[0]%2 == 1 and cell[1]%2 == 0) or (cell[0]%2 == 0 and cell[1]%2 == 1):
-            return [(cell[0] + a[0], cell[1] + a[1])
-                for a in [(-1, 0), (1, 0), (0, -1), (0, 1)]
-                if ((0 <= cell[0] + a[0] < board_shape[0]) and (0 <= cell[1] + a[1] < board_shape[1]))]
+        return list(get_board_tables(board_shape).neighbours.get(cell, ()))
 
     @staticmethod 
     def make_move(state, action, player):
-        """Transform the action of the player to a move. The move is made and the reward computed. 
+        """Transform the action of the player to a move. The move is made in place on the state and the reward
+        computed. The action is not checked, see act for that.
 
         Args:
             state (FarononaState): A state object from the Faronona game.
             action (Action): An action object containing the move.
             player (int): The number of the player making the move.
 
-        Returns: (next_state, done, next_is_reward): Gives the next state of the game along with the game status and
-        the type of the next step.
+        Returns:
+            MoveUndo: The record to give to unmake_move to restore the state as it was before the move.
         """
         board = state.get_board()
+        # The JSON form is a copy of the move, kept by the state.
         json_action = action.get_json_action()
-        action = action.get_action_as_dict()
         win = False 
 
-        if action['action_type'] == FarononaActionType.MOVE:
-            at = action['action']['at']
-            to = action['action']['to']
-            winby = action['winby']
+        if action.action_type == FarononaActionType.MOVE:
+            at = json_action['action']['at']
+            to = json_action['action']['to']
+            winby = action.win_by
+        previous = (state.get_latest_player(), state.get_latest_move(), state.get_next_player(), dict(state.score),
+                    dict(state.on_board), state.boring_moves, state.rewarding_move, state.captured, state.winmove,
+                    list(state.occuped), state.occupedplayer, state.zobrist)
+        hashed = state.zobrist is not None
+        if hashed:
+            keys = get_zobrist_keys(board.board_shape)
+            state.zobrist ^= keys.get_context_key(state) ^ keys.get_piece_key(player, at)
         board.empty_cell(at)
         board.fill_cell(to, Color(player))
 
@@ -162,10 +177,39 @@ class FarononaRules(Rule):
             state.winmove = None
             state.captured = None
             state.occuped = []
-            
 
-        done = FarononaRules.is_end_game(state)
-        return state, done
+        if hashed:
+            state.zobrist ^= keys.get_piece_key(player, to) ^ keys.get_context_key(state)
+            if win:
+                for element in state.captured:
+                    state.zobrist ^= keys.get_piece_key(player * -1, element)
+        return MoveUndo(at, to, player, state.captured if win else (), *previous)
+
+    @staticmethod
+    def unmake_move(state, undo):
+        """Restore the state as it was before make_move (and moment_player) were called.
+
+        Args:
+            state (FarononaState): The state the move was made on.
+            undo (MoveUndo): The record returned by make_move.
+        """
+        board = state.get_board()
+        board.empty_cell(undo.to)
+        board.fill_cell(undo.at, Color(undo.player))
+        for cell in undo.captured:
+            board.fill_cell(cell, Color(undo.player * -1))
+        state.set_latest_player(undo.latest_player)
+        state.set_latest_move(undo.latest_move)
+        state.set_next_player(undo.next_player)
+        state.score.update(undo.score)
+        state.on_board.update(undo.on_board)
+        state.boring_moves = undo.boring_moves
+        state.rewarding_move = undo.rewarding_move
+        state.captured = undo.state_captured
+        state.winmove = undo.winmove
+        state.occuped = undo.occuped
+        state.occupedplayer = undo.occupedplayer
+        state.zobrist = undo.zobrist
 
     @staticmethod
     def act(state, action, player): 
@@ -177,121 +221,53 @@ class FarononaRules(Rule):
             player (int): The number of the player making the move.
 
         Returns:
-            bool: True if everything goes fine and the move was made. False is else.
+            (next_state, done): The state after the move and the game status. False if the move is illegal.
         """
         if FarononaRules.is_legal_move(state, action, player):
-            return FarononaRules.make_move(state, action, player)
+            FarononaRules.make_move(state, action, player)
+            return state, FarononaRules.is_end_game(state)
         else:
             return False
 
     @staticmethod
     def is_win_approach_move(at, to, state, player):
         board = state.get_board()
-        opponent_pieces = board.get_player_pieces_on_board(Color(player * -1))
-        i,j = at
-        k,l = to
-        captured = []
-
-        if i == k:
-            if (j-l == 1 and (i, l-1) in opponent_pieces):
-                while (i, l-1) in opponent_pieces:
-                    captured.append((i, l-1))
-                    l=l-1
-                return captured
-            if (j-l == -1 and (i, l+1) in opponent_pieces):
-                while (i, l+1) in opponent_pieces:
-                    captured.append((i, l+1))
-                    l=l+1
-                return captured 
-        elif j == l:
-            if (i-k == 1 and (k-1, j) in opponent_pieces): 
-                while (k-1, j) in opponent_pieces:
-                    captured.append((k-1, j))
-                    k=k-1
-                return captured 
-            if (i-k == -1 and (k+1, j) in opponent_pieces):
-                while (k+1, j) in opponent_pieces:
-                    captured.append((k+1, j))
-                    k=k+1
-                return captured 
-        elif (k == i+1 and l == j+1 and (i+2, j+2) in opponent_pieces):
-            while (i+2, j+2) in opponent_pieces:
-                captured.append((i+2, j+2))
-                i=i+1
-                j=j+1
-            return captured
-        elif (k == i-1 and l == j-1 and (i-2, j-2) in opponent_pieces):
-            while (i-2, j-2) in opponent_pieces:
-                captured.append((i-2, j-2))
-                i=i-1
-                j=j-1
-            return captured
-        elif (k == i-1 and l == j+1 and (i-2, j+2) in opponent_pieces):
-            while (i-2, j+2) in opponent_pieces:
-                captured.append((i-2, j+2))
-                i=i-1
-                j=j+1
-            return captured
-        elif (k == i+1 and l == j-1 and (i+2, j-2) in opponent_pieces):
-            while (i+2, j-2) in opponent_pieces:
-                captured.append((i+2, j-2))
-                i=i+1
-                j=j-1
-            return captured
+        if isinstance(board, FarononaBitboard):
+            return board.get_captures(at, to, player, approach=True)
+        tables = get_board_tables(board.board_shape)
+        direction = tables.get_direction(at, to)
+        if direction is not None:
+            opponent_pieces = board.get_player_pieces_on_board(Color(player * -1))
+            return FarononaRules.get_ray_captures(tables.rays[to][direction], opponent_pieces)
 
     @staticmethod
     def is_win_remote_move(at, to, state, player):
         board = state.get_board()
-        opponent_pieces = board.get_player_pieces_on_board(Color(player * -1))
-        i,j = at
-        k,l = to
-        captured = []
+        if isinstance(board, FarononaBitboard):
+            return board.get_captures(at, to, player, approach=False)
+        tables = get_board_tables(board.board_shape)
+        direction = tables.get_direction(at, to)
+        if direction is not None:
+            opponent_pieces = board.get_player_pieces_on_board(Color(player * -1))
+            return FarononaRules.get_ray_captures(tables.rays[at][OPPOSITE[direction]], opponent_pieces)
 
-        if i == k:
-            if (j-l == 1 and (i, j+1) in opponent_pieces):
-                while (i, j+1) in opponent_pieces:
-                    captured.append((i, j+1))
-                    j=j+1
-                return captured 
-            if (j-l == -1 and (i, j-1) in opponent_pieces):
-                while (i, j-1) in opponent_pieces:
-                    captured.append((i, j-1))
-                    j=j-1
-                return captured 
-        elif j == l:
-            if (i-k == 1 and (i+1, j) in opponent_pieces):
-                while (i+1, j) in opponent_pieces:
-                    captured.append((i+1, j))
-                    i=i+1
-                return captured 
-            if (i-k == -1 and (i-1, j) in opponent_pieces):
-                while (i-1, j) in opponent_pieces:
-                    captured.append((i-1, j))
-                    i=i-1
-                return captured 
-        elif (k == i+1 and l == j+1 and (i-1, j-1) in opponent_pieces):
-            while (i-1, j-1) in opponent_pieces:
-                captured.append((i-1, j-1))
-                i=i-1
-                j=j-1
-            return captured
-        elif (k == i-1 and l == j-1 and (i+1, j+1) in opponent_pieces):
-            while (i+1, j+1) in opponent_pieces:
-                captured.append((i+1, j+1))
-                i=i+1
-                j=j+1
-            return captured
-        elif (k == i-1 and l == j+1 and (i+1, j-1) in opponent_pieces):
-            while (i+1, j-1) in opponent_pieces:
-                captured.append((i+1, j-1))
-                i=i+1
-                j=j-1
-            return captured
-        elif (k == i+1 and l == j-1 and (i-1, j+1) in opponent_pieces):
-            while (i-1, j+1) in opponent_pieces:
-                captured.append((i-1, j+1))
-                i=i-1
-                j=j+1
+    @staticmethod
+    def get_ray_captures(ray, opponent_pieces):
+        """Give the opponent pieces lined up at the start of a capture ray.
+
+        Args:
+            ray (Tuple): The ordered cells of the line, starting next to the capturing piece.
+            opponent_pieces (Set[(int, int)]): The cells of the opponent pieces.
+
+        Returns:
+            List: The captured cells from the nearest to the farthest. None if nothing is captured.
+        """
+        captured = []
+        for cell in ray:
+            if cell not in opponent_pieces:
+                break
+            captured.append(cell)
+        if len(captured) != 0:
             return captured
 
     @staticmethod 
@@ -305,35 +281,212 @@ class FarononaRules(Rule):
         Returns:
             List[FarononaAction]: Contains all possible actions for a player at the given state.
         """
-        actions, winacts, simpleacts = [], [], []
+        moves = FarononaRules.analyse_moves(state, player)
+        if moves is not None:
+            space = get_action_space(state.get_board().board_shape)
+            return [space.get_action(at, to) for at, to, _, _ in moves]
+
+    @staticmethod
+    def get_scored_actions(state, player):
+        """Provide the possible actions of a player along with the number of pieces each one captures. A move
+        capturing both by approach and by remote gives two actions, the APPROACH one first.
+
+        Args:
+            state (FarononaState): A state object from the Faronona game.
+            player (int): The number of the player making the move.
+
+        Returns:
+            List[(FarononaAction, int)]: The actions, with the win_by set for the capturing ones, and their captures
+            count. 0 for a move that captures nothing.
+        """
+        moves = FarononaRules.analyse_moves(state, player)
+        if moves is None:
+            return None
+        space = get_action_space(state.get_board().board_shape)
+        scored = []
+        for at, to, approach, remote in moves:
+            if approach:
+                scored.append((space.get_action(at, to, 'APPROACH'), len(approach)))
+            if remote:
+                scored.append((space.get_action(at, to, 'REMOTE'), len(remote)))
+            if not approach and not remote:
+                scored.append((space.get_action(at, to), 0))
+        return scored
+
+    @staticmethod
+    def analyse_moves(state, player):
+        """Give the possible moves of a player with their approach and remote captures, computed in a single pass.
+        As for get_player_actions, only the capturing moves are given when there is at least one, and during a combo
+        only the capturing moves of the piece that just captured.
+
+        Args:
+            state (FarononaState): A state object from the Faronona game.
+            player (int): The number of the player making the move.
+
+        Returns:
+            List[((int, int), (int, int), List, List)]: The (at, to, approach, remote) of each move. approach and
+            remote are the captured cells, None when the move does not capture that way. None if the player cannot
+            play during the combo of the other player.
+        """
+        cache = FarononaRules.cache
+        if cache is None:
+            return FarononaRules._analyse_moves(state, player)
+        moves = cache.get(state.get_hash(), ('moves', player), default=False)
+        if moves is False:
+            moves = FarononaRules._analyse_moves(state, player)
+            cache.put(state.get_hash(), ('moves', player), moves)
+        return list(moves) if moves is not None else None
+
+    @staticmethod
+    def _analyse_moves(state, player):
         board = state.get_board()
+        if isinstance(board, FarononaBitboard):
+            return FarononaRules.analyse_bitboard_moves(state, player)
+        tables = get_board_tables(board.board_shape)
         empty_cells = board.get_all_empty_cells()
-        player_pieces = board.get_player_pieces_on_board(Color(player))
+        opponent_pieces = board.get_player_pieces_on_board(Color(player * -1))
         if state.winmove is not None:
             if player == state.get_latest_player() == state.get_next_player():
-                at, to = state.winmove
-                moves = FarononaRules.get_effective_cell_moves(state, to)
-                if moves:
-                    for move in moves:
-                        if move in empty_cells and move not in state.occuped:
-                            if move[0] != at[0] or move[1] != at[1] or ((move[0] != at[0] + 2 or move[0] != at[0] - 2) and (move[1] != at[1] + 2 or move[1] != at[1] - 2)):
-                                if (FarononaRules.is_win_approach_move(to, move, state, player) is not None and len(FarononaRules.is_win_approach_move(to, move, state, player)) != 0) or (FarononaRules.is_win_remote_move(to, move, state, player) is not None and len(FarononaRules.is_win_remote_move(to, move, state, player)) != 0):
-                                    actions.append(FarononaAction(action_type=FarononaActionType.MOVE, at=to, to=move))
-                    return actions
-        else:
-            for piece in player_pieces:
-                moves = FarononaRules.get_effective_cell_moves(state, piece)
-                if moves:
-                    for move in moves:
-                        if move in empty_cells:
-                            if (FarononaRules.is_win_approach_move(piece, move, state, player) is not None and len(FarononaRules.is_win_approach_move(piece, move, state, player)) != 0) or (FarononaRules.is_win_remote_move(piece, move, state, player) is not None and len(FarononaRules.is_win_remote_move(piece, move, state, player)) != 0):
-                                winacts.append(FarononaAction(action_type=FarononaActionType.MOVE, at=piece, to=move))
-                            else:
-                                simpleacts.append(FarononaAction(action_type=FarononaActionType.MOVE, at=piece, to=move))
-            if len(winacts) != 0:
-                return winacts
+                moves = []
+                _, to = state.winmove
+                for direction, move in tables.moves[to]:
+                    # The piece cannot go back to a cell it already visited during the combo.
+                    if move in empty_cells and move not in state.occuped:
+                        approach = FarononaRules.get_ray_captures(tables.rays[move][direction], opponent_pieces)
+                        remote = FarononaRules.get_ray_captures(tables.rays[to][OPPOSITE[direction]],
+                                                                opponent_pieces)
+                        if approach or remote:
+                            moves.append((to, move, approach, remote))
+                return moves
+            return None
+        winmoves, simplemoves = [], []
+        for piece in sorted(board.get_player_pieces_on_board(Color(player))):
+            for direction, move in tables.moves[piece]:
+                if move in empty_cells:
+                    approach = FarononaRules.get_ray_captures(tables.rays[move][direction], opponent_pieces)
+                    remote = FarononaRules.get_ray_captures(tables.rays[piece][OPPOSITE[direction]], opponent_pieces)
+                    if approach or remote:
+                        winmoves.append((piece, move, approach, remote))
+                    elif not winmoves:
+                        simplemoves.append((piece, move, None, None))
+        if len(winmoves) != 0:
+            return winmoves
+        return simplemoves
+
+    @staticmethod
+    def analyse_bitboard_moves(state, player):
+        """Same as analyse_moves for a state whose board is a FarononaBitboard. Candidate moves come from the
+        adjacency masks and captures are detected with the capture-ray masks.
+
+        Args:
+            state (FarononaState): A state object from the Faronona game.
+            player (int): The number of the player making the move.
+
+        Returns:
+            List[((int, int), (int, int), List, List)]: The (at, to, approach, remote) of each move.
+        """
+        board = state.get_board()
+        tables = board.tables
+        empty = board.get_empty_mask()
+        opponent = board.masks[-player]
+        steps = tables.steps
+        if state.winmove is not None:
+            if player == state.get_latest_player() == state.get_next_player():
+                moves = []
+                _, to = state.winmove
+                origin = tables.index(to)
+                free = tables.adjacency[origin] & empty & ~tables.mask_of(state.occuped)
+                for direction, target in tables.moves[origin]:
+                    if free >> target & 1:
+                        approach, remote = FarononaRules._get_bitboard_capture_masks(board, steps, opponent, origin,
+                                                                                    target, direction)
+                        if approach or remote:
+                            moves.append((to, tables.cells[target],
+                                          FarononaRules._get_mask_captures(tables, approach, direction),
+                                          FarononaRules._get_mask_captures(tables, remote, OPPOSITE[direction])))
+                return moves
+            return None
+        winmoves, simplemoves = [], []
+        pieces = board.masks[player]
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            origin = low.bit_length() - 1
+            free = tables.adjacency[origin] & empty
+            if not free:
+                continue
+            at = tables.cells[origin]
+            for direction, target in tables.moves[origin]:
+                if free >> target & 1:
+                    approach, remote = FarononaRules._get_bitboard_capture_masks(board, steps, opponent, origin,
+                                                                                target, direction)
+                    if approach or remote:
+                        winmoves.append((at, tables.cells[target],
+                                         FarononaRules._get_mask_captures(tables, approach, direction),
+                                         FarononaRules._get_mask_captures(tables, remote, OPPOSITE[direction])))
+                    elif not winmoves:
+                        simplemoves.append((at, tables.cells[target], None, None))
+        if len(winmoves) != 0:
+            return winmoves
+        return simplemoves
+
+    @staticmethod
+    def _get_bitboard_capture_masks(board, steps, opponent, origin, target, direction):
+        """Give the approach and remote capture masks of a move. The rays are only walked when the cell next to
+        them holds an opponent piece, which most moves do not have."""
+        approach = remote = 0
+        if opponent & steps[target][direction]:
+            approach = board.get_capture_mask(target, direction, opponent)
+        if opponent & steps[origin][OPPOSITE[direction]]:
+            remote = board.get_capture_mask(origin, OPPOSITE[direction], opponent)
+        return approach, remote
+
+    @staticmethod
+    def _get_mask_captures(tables, mask, direction):
+        if mask:
+            return tables.cells_of(mask, tables.ascending[direction])
+
+    @staticmethod
+    def get_capture_sequences(state, player):
+        """Provide the complete turns of a player as macro-moves. A capture is followed by every possible
+        continuation of the combo until the piece cannot capture anymore, with the constraints of
+        get_player_actions (no visited cell). A macro-move does not go on along the direction of its latest capture
+        either: such a continuation, allowed by get_player_actions, ends the turn where it stands. Without any
+        capture, each simple move is a turn of its own.
+
+        Args:
+            state (FarononaState): A state object from the Faronona game. It is left unchanged.
+            player (int): The number of the player making the moves.
+
+        Returns:
+            List[(Tuple[FarononaAction], int)]: The actions of each turn in playing order, along with the total
+            number of captured pieces.
+        """
+        sequences = []
+        FarononaRules._extend_capture_sequences(state, player, (), 0, sequences)
+        return sequences
+
+    @staticmethod
+    def _extend_capture_sequences(state, player, actions, captured, sequences):
+        scored_actions = FarononaRules.get_scored_actions(state, player) or []
+        if actions:
+            tables = get_board_tables(state.get_board().board_shape)
+            latest = actions[-1].action
+            last_direction = tables.get_direction(latest['at'], latest['to'])
+            scored_actions = [(action, score) for action, score in scored_actions
+                              if tables.get_direction(action.action['at'], action.action['to']) != last_direction]
+            if not scored_actions:
+                sequences.append((actions, captured))
+                return
+        for action, score in scored_actions:
+            undo = FarononaRules.make_move(state, action, player)
+            FarononaRules.moment_player(state, COMBO_PLAYERS)
+            if state.get_next_player() == player and state.winmove is not None:
+                FarononaRules._extend_capture_sequences(state, player, actions + (action,), captured + score,
+                                                        sequences)
             else:
-                return simpleacts
+                sequences.append((actions + (action,), captured + score))
+            FarononaRules.unmake_move(state, undo)
 
     @staticmethod
     def moment_player(state, players):
@@ -344,8 +497,13 @@ class FarononaRules(Rule):
                 if players[player].allow_combo is True and len(action) != 0:
                     return player
                 else:
+                    if state.zobrist is not None:
+                        keys = get_zobrist_keys(state.get_board().board_shape)
+                        state.zobrist ^= keys.get_context_key(state)
                     state.winmove = None 
                     state.set_next_player(player * -1) 
+                    if state.zobrist is not None:
+                        state.zobrist ^= keys.get_context_key(state)
                     return player * -1
         return player 
 
@@ -392,6 +550,19 @@ class FarononaRules(Rule):
         Returns:
             bool: True if the given state is the final. False if not.
         """
+        cache = FarononaRules.cache
+        if cache is None:
+            return FarononaRules._is_end_game(state)
+        latest_player = state.get_latest_player()
+        key = ('end', latest_player, state.score.get(latest_player), FarononaRules.is_boring(state))
+        done = cache.get(state.get_hash(), key)
+        if done is None:
+            done = FarononaRules._is_end_game(state)
+            cache.put(state.get_hash(), key, done)
+        return done
+
+    @staticmethod
+    def _is_end_game(state):
         if FarononaRules.is_player_stuck(state, state.get_next_player()) or FarononaRules.is_boring(state) : #
             return True
         latest_player_score = state.score[state.get_latest_player()]
@@ -399,6 +570,30 @@ class FarononaRules(Rule):
             return True
         return False
 
+    @staticmethod
+    def enable_cache(max_size=10000):
+        """Cache the move analysis (behind get_player_actions and get_scored_actions) and the end of game status
+        of the positions, keyed by their hash. The cache is off by default and is shared by every caller of the
+        rules in the process, the referee included.
+
+        The hash only follows the changes made through make_move, unmake_move, act and moment_player. Once the cache
+        is enabled, every state change must go through them: a state whose board or score is edited directly (on a
+        deep copy too) has a stale hash, and gets the moves and end of game status of another position, unless
+        reset_hash is called after the change.
+
+        Args:
+            max_size (int, optional): Maximum number of positions kept. Defaults to 10000.
+
+        Returns:
+            PositionCache: The cache, which gives the hits/misses counters and the invalidation methods.
+        """
+        FarononaRules.cache = PositionCache(max_size)
+        return FarononaRules.cache
+
+    @staticmethod
+    def disable_cache():
+        FarononaRules.cache = None
+
     @staticmethod
     def is_boring(state):
         """Check if the game is ongoing without winning moves
@@ -1,5 +1,7 @@
 
 import json
+from core import Board, Color
+from faronona.faronona_zobrist import get_zobrist_keys
 
 class FarononaState(object):  # TODO: Link it to the core state.
 
@@ -15,6 +17,8 @@ class FarononaState(object):  # TODO: Link it to the core state.
                 **********
             - just_stop      : The limit of non rewarding moves
             - boring_moves   : The current number of non rewarding moves
+            - zobrist        : The hash of the position, None until get_hash is called. Then kept up to date by
+                               FarononaRules.make_move, unmake_move and moment_player.
            
         Args:
             board (Board): The board game
@@ -35,6 +39,7 @@ class FarononaState(object):  # TODO: Link it to the core state.
         self.winmove = None
         self.occuped = []
         self.occupedplayer = None
+        self.zobrist = None
 
     def get_board(self):
         return self.board
@@ -60,6 +65,22 @@ class FarononaState(object):  # TODO: Link it to the core state.
     def set_latest_player(self, player):
         self._latest_player = player
 
+    def get_hash(self):
+        """Give the 64-bit Zobrist hash of the position: the board, the next player, the combo context (winmove
+        and occuped) and the bucket of boring moves. Two states with the same hash can be considered the same
+        position.
+
+        Returns:
+            int: The hash of the position.
+        """
+        if self.zobrist is None:
+            self.zobrist = get_zobrist_keys(self.board.board_shape).hash_state(self)
+        return self.zobrist
+
+    def reset_hash(self):
+        """Forget the hash. To call after changing the board or the attributes without FarononaRules."""
+        self.zobrist = None
+
     def get_player_info(self, player):
         return {'on_board': self.on_board[player],
                 'score': self.score[player]}
@@ -77,3 +98,27 @@ class FarononaState(object):  # TODO: Link it to the core state.
                       'board': self.board.get_json_board(),
                       }
         return json.dumps(json_state, default=str)
+
+
+def get_initial_state(board_shape=(5, 9), next_player=-1, boring_limit=50, board_class=Board):
+    """Give the starting position of a game, set up like BoardGUI.init_board: the player -1 on the top rows, the
+    player 1 on the bottom rows and the middle row shared, outside of the GUI.
+
+    Args:
+        board_shape ((int, int), optional): The board shape. Defaults to (5, 9).
+        next_player (int, optional): The first player. Defaults to -1.
+        boring_limit (int, optional): Limit of non rewarding moves. Defaults to 50.
+        board_class (type, optional): Board or FarononaBitboard. Defaults to Board.
+
+    Returns:
+        FarononaState: The initial state.
+    """
+    board = board_class(board_shape)
+    middle = board_shape[0] - 3
+    for x in range(board_shape[0]):
+        for y in range(board_shape[1]):
+            if x < middle or (x == middle and y in [0, 2, 5, 7]):
+                board.fill_cell((x, y), Color(-1))
+            elif x > middle or (x == middle and y in [1, 3, 6, 8]):
+                board.fill_cell((x, y), Color(1))
+    return FarononaState(board, next_player=next_player, boring_limit=boring_limit)
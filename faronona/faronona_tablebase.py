@@ -0,0 +1,321 @@
+"""Endgame tablebase of the Faronona positions with few pieces, solved by retrograde analysis."""
+
+import argparse
+import mmap
+import struct
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+from core import Board, Color
+from faronona.faronona_rules import FarononaRules, COMBO_PLAYERS
+from faronona.faronona_state import FarononaState
+
+MAGIC = b'FTBASE01'
+HEADER = struct.Struct('<8sIIII')  # magic, rows, columns, boring limit, maximum number of pieces
+RECORD = struct.Struct('<H')  # value (2 bits), stable from (6 bits), distance (8 bits)
+VALUES = (0, 1, -1)  # draw, win, loss, by the 2 low bits of a record
+MAX_DISTANCE = 255
+
+
+def get_layout(n_cells, max_pieces):
+    """Give where the positions of each composition are stored, the compositions of fewer pieces first.
+
+    A composition (a, b) holds the positions with a pieces of the player to move and b pieces of the other one, both
+    at least 1. The colors do not matter: the moves are the same for both players.
+
+    Returns:
+        Dict[(int, int), (int, int)]: The offset and the number of positions of each composition.
+    """
+    layout, offset = {}, 0
+    for n_pieces in range(2, max_pieces + 1):
+        for own in range(1, n_pieces):
+            size = comb(n_cells, own) * comb(n_cells - own, n_pieces - own)
+            layout[(own, n_pieces - own)] = (offset, size)
+            offset += size
+    return layout
+
+
+def get_position_index(own, opponent, n_cells):
+    """Give the index of a position within its composition.
+
+    Args:
+        own (List[int]): The sorted cell numbers (row * columns + column) of the pieces of the player to move.
+        opponent (List[int]): The sorted cell numbers of the pieces of the other player.
+        n_cells (int): The number of cells of the board.
+
+    Returns:
+        int: The colex rank of the own cells, then of the opponent cells among the cells left.
+    """
+    own_rank = sum(comb(cell, i + 1) for i, cell in enumerate(own))
+    opponent_rank, j = 0, 0
+    for i, cell in enumerate(opponent):
+        while j < len(own) and own[j] < cell:
+            j += 1
+        opponent_rank += comb(cell - j, i + 1)
+    return own_rank * comb(n_cells - len(own), len(opponent)) + opponent_rank
+
+
+def build_tablebase(max_pieces=3, board_shape=(5, 9), boring_limit=50):
+    """Solve every position with at most max_pieces pieces, at the start of a turn.
+
+    The game ends when the player to move has no move, when a capture took the last opponent piece or after
+    boring_limit moves without capture, and the player with the higher score wins. As both players start with the
+    same number of pieces, that is the player with more pieces on the board. The turns are the ones of
+    FarononaRules.get_capture_sequences, captures being mandatory, so a position either captures or only has simple
+    moves. A turn is over when its combo could only go on along the direction of its latest capture, as these
+    turns are cut there.
+
+    The boring_moves counter is part of the position. A capture sets it to 1, which leaves a fixed number of simple
+    moves, boring_limit - 1, after any capturing turn: the value of a capturing position does not depend on the
+    counter and is read in the tables of fewer pieces. A simple move uses up one of the moves left, so the positions
+    with the same pieces are solved together, for 0 moves left (the game is over) then 1, 2, ... up to
+    boring_limit - 1. The value kept is the one with boring_limit - 1 moves left, along with the smallest number of
+    moves left from which the value is the same.
+
+    Args:
+        max_pieces (int, optional): Largest number of pieces on the board, both players together. Defaults to 3.
+        board_shape ((int, int), optional): The board shape. Defaults to (5, 9).
+        boring_limit (int, optional): Limit of non rewarding moves of the games, 64 at most. Defaults to 50.
+
+    Returns:
+        np.ndarray: The records of the positions, in the order of get_layout.
+    """
+    assert 2 <= boring_limit <= 64, "The moves left must fit in 6 bits"
+    n_cells = board_shape[0] * board_shape[1]
+    layout = get_layout(n_cells, max_pieces)
+    records = np.zeros(sum(size for _, size in layout.values()), dtype='<u2')
+    horizon = boring_limit - 1
+    state = FarononaState(Board(board_shape), next_player=1, boring_limit=boring_limit)
+
+    def index_of(own, opponent):
+        offset, _ = layout[(len(own), len(opponent))]
+        return offset + get_position_index(own, opponent, n_cells)
+
+    def turn_result(actions):
+        """The value and distance of a capturing turn for the player 1, from the records of fewer pieces."""
+        undos = []
+        for action in actions:
+            undos.append(FarononaRules.make_move(state, action, 1))
+            FarononaRules.moment_player(state, COMBO_PLAYERS)
+        board = state.get_board()
+        own = sorted(x * board_shape[1] + y for x, y in board.get_player_pieces_on_board(Color(-1)))
+        opponent = sorted(x * board_shape[1] + y for x, y in board.get_player_pieces_on_board(Color(1)))
+        for undo in reversed(undos):
+            FarononaRules.unmake_move(state, undo)
+        if not own:
+            return 1, 1
+        record = int(records[index_of(own, opponent)])
+        return -VALUES[record & 3], 1 + (record >> 8)
+
+    for n_pieces in range(2, max_pieces + 1):
+        compositions = [(own, n_pieces - own) for own in range(1, n_pieces)]
+        start = layout[compositions[0]][0]
+        count = sum(layout[composition][1] for composition in compositions)
+        fixed_value = np.zeros(count, dtype=np.int8)  # value of the terminal and capturing positions
+        fixed_distance = np.zeros(count, dtype=np.int32)
+        sign = np.zeros(count, dtype=np.int8)  # value when the game ends, by the pieces on the board
+        quiet, successors, starts = [], [], []
+        for n_own, n_opponent in compositions:
+            for own in combinations(range(n_cells), n_own):
+                rest = [cell for cell in range(n_cells) if cell not in own]
+                for opponent_rank in combinations(range(n_cells - n_own), n_opponent):
+                    opponent = [rest[j] for j in opponent_rank]
+                    i = index_of(own, opponent) - start
+                    sign[i] = fixed_value[i] = np.sign(n_own - n_opponent)
+                    _set_position(state, own, opponent)
+                    moves = FarononaRules.analyse_moves(state, 1)
+                    if not moves:
+                        continue
+                    if moves[0][2] or moves[0][3]:
+                        results = [turn_result(actions)
+                                   for actions, _ in FarononaRules.get_capture_sequences(state, 1)]
+                        best = max(value for value, _ in results)
+                        distances = [distance for value, distance in results if value == best]
+                        fixed_value[i] = best
+                        fixed_distance[i] = max(distances) if best < 0 else min(distances)
+                        continue
+                    quiet.append(i)
+                    starts.append(len(successors))
+                    for at, to, _, _ in moves:
+                        moved = sorted(to[0] * board_shape[1] + to[1] if cell == at[0] * board_shape[1] + at[1]
+                                       else cell for cell in own)
+                        successors.append(index_of(opponent, moved) - start)
+        _set_position(state, (), ())
+
+        # Retrograde passes over the moves left: the simple moves lead to the same pieces with one move less.
+        quiet, successors, starts = np.array(quiet), np.array(successors), np.array(starts)
+        lengths = np.diff(np.append(starts, len(successors)))
+        value, distance = sign.copy(), np.zeros(count, dtype=np.int32)
+        stable = np.zeros(count, dtype=np.int32)
+        for moves_left in range(1, horizon + 1):
+            new_value, new_distance = fixed_value.copy(), fixed_distance.copy()
+            if len(quiet):
+                child_value, child_distance = -value[successors], distance[successors]
+                best = np.maximum.reduceat(child_value, starts)
+                on_best = child_value == np.repeat(best, lengths)
+                # Win as soon as possible, lose as late as possible.
+                fastest = np.minimum.reduceat(np.where(on_best, child_distance, np.iinfo(np.int32).max), starts)
+                slowest = np.maximum.reduceat(np.where(on_best, child_distance, -1), starts)
+                new_value[quiet] = best
+                new_distance[quiet] = 1 + np.where(best < 0, slowest, fastest)
+            stable[new_value != value] = moves_left
+            value, distance = new_value, new_distance
+        records[start:start + count] = ((value % 3) | (stable << 2)
+                                        | (np.minimum(distance, MAX_DISTANCE) << 8)).astype('<u2')
+    return records
+
+
+def _set_position(state, own, opponent):
+    """Put the pieces of the player 1 on the own cells and the ones of the player -1 on the opponent cells."""
+    board = state.get_board()
+    columns = board.board_shape[1]
+    for color in (Color(1), Color(-1)):
+        for cell in list(board.get_player_pieces_on_board(color)):
+            board.empty_cell(cell)
+    for cell in own:
+        board.fill_cell((cell // columns, cell % columns), Color(1))
+    for cell in opponent:
+        board.fill_cell((cell // columns, cell % columns), Color(-1))
+    state.on_board = {1: len(own), -1: len(opponent)}
+    state.reset_hash()
+
+
+def write_tablebase(path, records, max_pieces=3, board_shape=(5, 9), boring_limit=50):
+    """Write the records given by build_tablebase, with the parameters they were built with."""
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, board_shape[0], board_shape[1], boring_limit, max_pieces))
+        f.write(np.asarray(records, dtype='<u2').tobytes())
+
+
+class EndgameTablebase(object):
+
+    def __init__(self, path):
+        """A tablebase file opened with mmap. Probing a position reads a single record.
+
+        Args:
+            path (str): The tablebase file, written by write_tablebase.
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, rows, columns, self.boring_limit, self.max_pieces = HEADER.unpack_from(self._map, 0)
+        assert magic == MAGIC, "Not a tablebase file"
+        self.board_shape = (rows, columns)
+        self.layout = get_layout(rows * columns, self.max_pieces)
+
+    def __getstate__(self):
+        # The map is not pickled, the file is opened again, in the worker processes for instance.
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __len__(self):
+        return sum(size for _, size in self.layout.values())
+
+    def close(self):
+        self._map.close()
+
+    def probe(self, state):
+        """Give the exact result of a position, with both players playing their best.
+
+        Args:
+            state (FarononaState): A state object from the Faronona game.
+
+        Returns:
+            (int, int): The value for the player to move, 1 for a win, 0 for a tie and -1 for a loss, and the number
+            of turns left until the end of the game with boring_limit - 1 moves left. None if the position is not in
+            the table: too many pieces, a combo going on, the game over, a different boring limit or too few moves
+            left for the stored value to hold.
+        """
+        player = state.get_next_player()
+        if state.on_board[player] + state.on_board[player * -1] > self.max_pieces:
+            return None
+        if state.winmove is not None and state.get_latest_player() == player:
+            return None
+        moves_left = state.just_stop - state.boring_moves
+        if state.just_stop != self.boring_limit or not 1 <= moves_left < self.boring_limit:
+            return None
+        board = state.get_board()
+        if board.board_shape != self.board_shape:
+            return None
+        columns = self.board_shape[1]
+        own = sorted(x * columns + y for x, y in board.get_player_pieces_on_board(Color(player)))
+        opponent = sorted(x * columns + y for x, y in board.get_player_pieces_on_board(Color(player * -1)))
+        composition = self.layout.get((len(own), len(opponent)))
+        if composition is None:
+            return None
+        index = composition[0] + get_position_index(own, opponent, self.board_shape[0] * columns)
+        record, = RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+        if moves_left < (record >> 2) & 63:
+            return None
+        return VALUES[record & 3], record >> 8
+
+    def get_score(self, state):
+        """Give a final score matching the exact result of a position, to stand in for a simulation: the current
+        scores, the winner's one raised if needed to lead by 1, or both raised to the higher one for a tie.
+
+        Returns:
+            Dict[int, int]: The score of each player, None if the position is not in the table.
+        """
+        result = self.probe(state)
+        if result is None:
+            return None
+        value, _ = result
+        player = state.get_next_player()
+        winner, loser = (player, player * -1) if value >= 0 else (player * -1, player)
+        score = dict(state.score)
+        if value == 0:
+            score[winner] = score[loser] = max(score.values())
+        else:
+            score[winner] = max(score[winner], score[loser] + 1)
+        return score
+
+    def get_action(self, state):
+        """Give the first move of the best turn of the player to move, the quickest win or the slowest loss.
+
+        Returns:
+            FarononaAction: The action, None if a position reached by one of the turns is not in the table.
+        """
+        player = state.get_next_player()
+        if state.on_board[player] >= self.max_pieces:
+            # Every turn leaving an opponent piece ends out of the table.
+            return None
+        best, best_key = None, None
+        for actions, _ in FarononaRules.get_capture_sequences(state, player):
+            undos = []
+            for action in actions:
+                undos.append(FarononaRules.make_move(state, action, player))
+                FarononaRules.moment_player(state, COMBO_PLAYERS)
+            if FarononaRules.is_end_game(state):
+                result = np.sign(state.score[player] - state.score[player * -1]), 0
+            else:
+                result = self.probe(state)
+                if result is not None:
+                    result = -result[0], result[1]
+            for undo in reversed(undos):
+                FarononaRules.unmake_move(state, undo)
+            if result is None:
+                return None
+            value, distance = result
+            key = (value, -distance if value > 0 else distance)
+            if best_key is None or key > best_key:
+                best, best_key = actions[0], key
+        return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build an endgame tablebase by retrograde analysis.')
+    parser.add_argument('-o', default='endgame_tablebase.bin', help='the tablebase file to write')
+    parser.add_argument('-p', type=int, default=3, help='largest number of pieces on the board')
+    parser.add_argument('-b', type=int, default=50, help='limit of non rewarding moves of the games')
+    args = parser.parse_args()
+
+    records = build_tablebase(args.p, boring_limit=args.b)
+    write_tablebase(args.o, records, args.p, boring_limit=args.b)
+    print('%d positions written to %s' % (len(records), args.o))
@@ -0,0 +1,61 @@
+"""Neighbour and capture-ray tables of the Faronona board, built once per board shape."""
+
+from functools import lru_cache
+
+# Up, down, left, right, then the four obliques. Every move listing follows this order.
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (1, -1), (-1, 1)]
+OPPOSITE = [1, 0, 3, 2, 5, 4, 7, 6]
+
+
+class BoardTables(object):
+
+    def __init__(self, board_shape):
+        """Precomputed geometry of a board. Each table is indexed by the cell coordinates:
+            - cells        : All the cells of the board, row by row
+            - directions   : The indexes (in DIRECTIONS) of the directions a piece on the cell can move along
+            - neighbours   : The cells a piece on the cell can move to, in the order of its directions
+            - moves        : The (direction, neighbour) pairs of the cell
+            - rays         : For each of the 8 directions, the ordered cells of the line starting next to the cell
+            - direction_of : Maps a (row, column) step to its index in DIRECTIONS
+
+        A piece moves along the obliques only from the cells whose coordinates have the same parity.
+
+        Args:
+            board_shape ((int, int)): The board shape.
+        """
+        rows, cols = board_shape
+        self.board_shape = board_shape
+        self.cells = [(i, j) for i in range(rows) for j in range(cols)]
+        self.direction_of = {direction: d for d, direction in enumerate(DIRECTIONS)}
+        self.directions, self.neighbours, self.moves, self.rays = {}, {}, {}, {}
+        for i, j in self.cells:
+            candidates = range(8) if (i + j) % 2 == 0 else range(4)
+            directions = [d for d in candidates if self.is_cell_on_board((i + DIRECTIONS[d][0], j + DIRECTIONS[d][1]))]
+            self.directions[(i, j)] = directions
+            self.moves[(i, j)] = [(d, (i + DIRECTIONS[d][0], j + DIRECTIONS[d][1])) for d in directions]
+            self.neighbours[(i, j)] = [move for _, move in self.moves[(i, j)]]
+            rays = []
+            for di, dj in DIRECTIONS:
+                ray, k, l = [], i + di, j + dj
+                while self.is_cell_on_board((k, l)):
+                    ray.append((k, l))
+                    k, l = k + di, l + dj
+                rays.append(tuple(ray))
+            self.rays[(i, j)] = rays
+
+    def __deepcopy__(self, memo):
+        # The tables are shared by every board of the same shape and never modified.
+        return self
+
+    def is_cell_on_board(self, cell):
+        return 0 <= cell[0] < self.board_shape[0] and 0 <= cell[1] < self.board_shape[1]
+
+    def get_direction(self, at, to):
+        """Give the index of the direction going from a cell to one of its neighbours. None if they are not."""
+        return self.direction_of.get((to[0] - at[0], to[1] - at[1]))
+
+
+@lru_cache(maxsize=None)
+def get_board_tables(board_shape):
+    """Give the tables of a board shape. They are built on the first call and shared afterwards."""
+    return BoardTables(board_shape)
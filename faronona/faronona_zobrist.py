@@ -0,0 +1,84 @@
+"""Zobrist keys used to hash the Faronona positions."""
+
+import random
+from functools import lru_cache
+
+from core import Color
+from faronona.faronona_tables import get_board_tables
+
+# Number of boring moves sharing the same key. Positions only differ when they are in different buckets.
+BORING_BUCKET = 10
+MAX_BORING_BUCKETS = 64
+
+
+class ZobristKeys(object):
+
+    def __init__(self, board_shape):
+        """Random 64-bit keys of a board shape. The keys are drawn from a generator seeded with the shape, so the
+        hash of a position is the same in every process and every run.
+            - pieces   : For each player, a key per cell occupied by one of its pieces
+            - side     : Added when the player 1 is the next to play
+            - winmove  : A key per cell for the start and the end of the latest capture of a combo
+            - occuped  : A key per cell already visited by the piece during the current combo
+            - boring   : A key per bucket of boring moves
+
+        Args:
+            board_shape ((int, int)): The board shape.
+        """
+        generator = random.Random("zobrist-%d-%d" % tuple(board_shape))
+        cells = get_board_tables(board_shape).cells
+
+        def draw():
+            return {cell: generator.getrandbits(64) for cell in cells}
+        self.pieces = {-1: draw(), 1: draw()}
+        self.side = generator.getrandbits(64)
+        self.winmove = (draw(), draw())
+        self.occuped = draw()
+        self.boring = [generator.getrandbits(64) for _ in range(MAX_BORING_BUCKETS)]
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def get_piece_key(self, player, cell):
+        return self.pieces[player][cell]
+
+    def get_context_key(self, state):
+        """Give the part of the hash that does not depend on the pieces: the side to move, the combo context and
+        the boring moves bucket.
+
+        Args:
+            state (FarononaState): A state object from the Faronona game.
+
+        Returns:
+            int: The XOR of the context keys.
+        """
+        key = self.boring[min(state.boring_moves // BORING_BUCKET, MAX_BORING_BUCKETS - 1)]
+        if state.get_next_player() == 1:
+            key ^= self.side
+        if state.winmove is not None:
+            at, to = state.winmove
+            key ^= self.winmove[0][at] ^ self.winmove[1][to]
+        for cell in state.occuped:
+            key ^= self.occuped[cell]
+        return key
+
+    def hash_state(self, state):
+        """Compute the full hash of a state.
+
+        Args:
+            state (FarononaState): A state object from the Faronona game.
+
+        Returns:
+            int: The 64-bit Zobrist hash.
+        """
+        board = state.get_board()
+        key = self.get_context_key(state)
+        for player in (-1, 1):
+            for cell in board.get_player_pieces_on_board(Color(player)):
+                key ^= self.pieces[player][cell]
+        return key
+
+
+@lru_cache(maxsize=None)
+def get_zobrist_keys(board_shape):
+    return ZobristKeys(board_shape)
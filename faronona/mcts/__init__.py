@@ -1,4 +1,7 @@
 """Monte Carlo Tree Search Agent implementation."""
 
+from .array_tree import ArraySearch, ArrayTree
+from .clock import TimeManager
 from .node import Node
-from .search import Search
\ No newline at end of file
+from .search import Search, close_worker_pools
+from .transposition import TranspositionTable
@@ -0,0 +1,199 @@
+"""Array-backed MCTS tree."""
+import time
+from copy import deepcopy
+import numpy as np
+from faronona.faronona_action import FarononaAction, get_action_space
+from faronona.faronona_eval import FarononaEvaluator
+from faronona.faronona_rules import FarononaRules, COMBO_PLAYERS
+from faronona.faronona_state import FarononaState
+from .node import Node
+
+UNEXPANDED = -1
+
+
+class ArrayTree(object):
+    """Struct-of-arrays store of the tree nodes.
+
+    A node is an index in parallel arrays: its visits, the results of each player backed up to it, its parent, the
+    action code leading to it and the range of its children. The children of a node are added all at once when it
+    is expanded, so they are contiguous. The arrays double in size when they are full. A node takes 38 bytes, a
+    million of them about 38 MB.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        """Initializer for the tree. The root is the node 0.
+
+        Args:
+            capacity (int): Number of nodes allocated at first. Defaults to 1024.
+        """
+        self.size = 0
+        self.visits = np.zeros(capacity, dtype=np.float64)
+        self.results = np.zeros((capacity, 2), dtype=np.float64)  # results[:, 0] for -1, results[:, 1] for 1
+        self.parent = np.zeros(capacity, dtype=np.int32)
+        self.action = np.zeros(capacity, dtype=np.int32)
+        self.first_child = np.zeros(capacity, dtype=np.int32)
+        self.n_children = np.zeros(capacity, dtype=np.int16)
+        self.add_nodes(-1, [-1])
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the arrays, allocated but unused nodes included."""
+        return sum(a.nbytes for a in (self.visits, self.results, self.parent, self.action, self.first_child,
+                                      self.n_children))
+
+    def _grow(self, capacity):
+        def grown(array):
+            new_array = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            new_array[:self.size] = array[:self.size]
+            return new_array
+        self.visits, self.results = grown(self.visits), grown(self.results)
+        self.parent, self.action = grown(self.parent), grown(self.action)
+        self.first_child, self.n_children = grown(self.first_child), grown(self.n_children)
+
+    def add_nodes(self, parent: int, codes) -> int:
+        """Append unvisited, unexpanded nodes with the same parent.
+
+        Returns:
+            int: The index of the first node added.
+        """
+        first, count = self.size, len(codes)
+        if first + count > len(self.visits):
+            self._grow(max(2 * len(self.visits), first + count))
+        self.size += count
+        self.parent[first:first + count] = parent
+        self.action[first:first + count] = codes
+        self.first_child[first:first + count] = UNEXPANDED
+        return first
+
+    def expand(self, index: int, codes) -> None:
+        """Add the children of a node, one per action code."""
+        self.first_child[index] = self.add_nodes(index, codes)
+        self.n_children[index] = len(codes)
+
+    def is_expanded(self, index: int) -> bool:
+        return self.first_child[index] != UNEXPANDED
+
+    def get_children(self, index: int) -> range:
+        first = self.first_child[index]
+        return range(first, first + self.n_children[index]) if first != UNEXPANDED else range(0)
+
+    def get_unvisited_child(self, index: int):
+        """Give the last child never visited, None if they all were."""
+        first = self.first_child[index]
+        unvisited = np.flatnonzero(self.visits[first:first + self.n_children[index]] == 0)
+        return first + unvisited[-1] if len(unvisited) else None
+
+    def get_q(self, index, agent: int):
+        """Returns the reward of the agent from the results, of one node or of an array of nodes."""
+        return self.results[index, (agent + 1) // 2] - self.results[index, (1 - agent) // 2]
+
+    def best_child(self, index: int, agent: int, epsilon: float = .9) -> int:
+        """Return the child with the greater Upper Confidence Bound, like Node.best_child.
+
+        The children must all have been visited. Node expands its untried actions from the last one, so the ties
+        go to the last child here.
+        """
+        children = slice(self.first_child[index], self.first_child[index] + self.n_children[index])
+        n = self.visits[children]
+        weights = self.get_q(children, agent) / n + epsilon * np.sqrt(2 * np.log(self.visits[index]) / n)
+        return children.stop - 1 - int(np.argmax(weights[::-1]))
+
+    def backpropagate(self, index: int, score) -> None:
+        """Add a rollout result to a node and all its ancestors."""
+        while index != -1:
+            self.visits[index] += 1
+            self.results[index, 0] += score[-1]
+            self.results[index, 1] += score[1]
+            index = self.parent[index]
+
+
+class ArraySearch(object):
+    """MCTS entry point storing the tree in an ArrayTree.
+
+    The nodes do not keep a state: the search plays the actions of the selected path on a single scratch state and
+    undoes them after the rollout. It branches on single moves and makes the same choices as Search with Node.
+    """
+
+    def __init__(self, agent: int, state: FarononaState, max_rollout_depth: int = float('inf'),
+                 capacity: int = 1024, evaluator: FarononaEvaluator = None, tablebase=None) -> None:
+        """Initializer for search.
+
+        Args:
+            agent (int): integer position of the IA Agent.
+            state (FarononaState): Root state, copied.
+            max_rollout_depth (int): Maximum depth to look into future during rollout. Defauls to end of game.
+            capacity (int): Number of nodes allocated at first. Defaults to 1024.
+            evaluator (FarononaEvaluator): Scores the rollouts stopped by max_rollout_depth, see Search.
+            tablebase (EndgameTablebase): Gives the exact result of the rollouts reaching its positions, see Search.
+        """
+        self.agent = agent
+        self.max_rollout_depth = max_rollout_depth
+        self.evaluator = evaluator if evaluator is not None else FarononaEvaluator()
+        self.tablebase = tablebase
+        self.tree = ArrayTree(capacity)
+        # The rollouts run from this node, whose state is the scratch state the path is played on.
+        self.scratch = Node(agent, deepcopy(state))
+        self.space = get_action_space(state.get_board().board_shape)
+        self.rollouts = 0
+        self.search_time = 0.
+
+    def best_action(self, n_iterations: int = None, time_iterations: float = None,
+                    epsilon: float = .1) -> FarononaAction:
+        """Search the best action to make, see Search.best_action."""
+        start_time = time.time()
+        if n_iterations is None:
+            assert(time_iterations is not None)
+            end_time = start_time + time_iterations
+            while time.time() < end_time:
+                self.run_iteration()
+        else:
+            for _ in range(n_iterations):
+                self.run_iteration()
+        self.search_time += time.time() - start_time
+        best_child = self.tree.best_child(0, self.agent, epsilon=epsilon)
+        return self.space.decode(self.tree.action[best_child])
+
+    def run_iteration(self):
+        """Run a single iteration."""
+        tree, state = self.tree, self.scratch.state
+        history = []
+        index = 0
+        try:
+            while not self._is_terminal(state):
+                if not tree.is_expanded(index):
+                    actions, _ = self.scratch.get_possible_actions(state, state.get_next_player())
+                    tree.expand(index, [self.space.encode(action) for action in actions])
+                child = tree.get_unvisited_child(index)
+                expanded = child is not None
+                if not expanded:
+                    child = tree.best_child(index, self.agent)
+                self._play(state, child, history)
+                index = child
+                if expanded:
+                    break
+            reward = self.scratch.rollout(max_depth=self.max_rollout_depth, evaluator=self.evaluator,
+                                          tablebase=self.tablebase)
+        finally:
+            while history:
+                FarononaRules.unmake_move(state, history.pop())
+        tree.backpropagate(index, reward)
+        self.rollouts += 1
+
+    def rollout_stats(self):
+        """Report the rollouts run so far, see Search.rollout_stats."""
+        return {'rollouts': self.rollouts, 'seconds': self.search_time,
+                'rollouts_per_second': self.rollouts / self.search_time if self.search_time else 0.}
+
+    def _play(self, state, index, history):
+        action = self.space.decode(self.tree.action[index])
+        history.append(FarononaRules.make_move(state, action, state.get_next_player()))
+        FarononaRules.moment_player(state, COMBO_PLAYERS)
+
+    @staticmethod
+    def _is_terminal(state):
+        if state.get_latest_player() is None:
+            return False
+        return FarononaRules.is_end_game(state)
@@ -0,0 +1,70 @@
+"""Time manager of the MCTS agent."""
+from faronona.faronona_state import FarononaState
+
+
+class TimeManager(object):
+    """Split the remaining clock of a player between its next moves."""
+
+    def __init__(self, safety_margin: float = .1, overhead: float = .02, max_fraction: float = .2,
+                 moves_per_piece: int = 2, min_moves_left: int = 4, min_iterations: int = 1) -> None:
+        """Initializer for the time manager.
+
+        Args:
+            safety_margin (float): Fraction of the remaining clock never planned for. Defaults to .1.
+            overhead (float): Seconds kept per move for the work done outside of the search (building the root,
+                              copying the state in the game runner). Defaults to .02.
+            max_fraction (float): Largest fraction of the usable clock given to a single move. Defaults to .2.
+            moves_per_piece (int): Estimated number of own moves per piece of the weakest side. Defaults to 2.
+            min_moves_left (int): The clock is always shared between at least this number of moves. Defaults to 4.
+            min_iterations (int): Iterations run even when the budget looks too short for them. Defaults to 1.
+        """
+        self.safety_margin = safety_margin
+        self.overhead = overhead
+        self.max_fraction = max_fraction
+        self.moves_per_piece = moves_per_piece
+        self.min_moves_left = min_moves_left
+        self.min_iterations = min_iterations
+        self.iterations_per_second = None
+
+    def estimate_moves_left(self, state: FarononaState) -> int:
+        """Estimate the number of moves the player still has to make.
+
+        The game ends when a side has no piece left, which takes a few moves per piece of the weakest side, or when
+        the boring limit is reached. Each player makes half of the boring moves left, but a capture resets them.
+        """
+        by_material = self.moves_per_piece * min(state.on_board[-1], state.on_board[1])
+        by_boring = (state.just_stop - state.boring_moves) // 2
+        return max(self.min_moves_left, min(by_material, by_boring))
+
+    def get_budget(self, state: FarononaState, remain_time: float) -> float:
+        """Give the number of seconds to search the next move.
+
+        Args:
+            state (FarononaState): The state to play.
+            remain_time (float): The seconds left on the clock of the player.
+
+        Returns:
+            float: The search time of the move. 0 if the clock is too short for anything but min_iterations.
+        """
+        moves_left = self.estimate_moves_left(state)
+        usable = remain_time * (1 - self.safety_margin) - self.overhead * moves_left
+        return max(0., min(usable / moves_left, usable * self.max_fraction))
+
+    def get_iterations(self, budget: float) -> int:
+        """Give the number of iterations to run instead of the budget when the measured speed says that fewer than
+        min_iterations fit in it. None if the budget is enough or the speed is not known yet."""
+        if self.iterations_per_second is None:
+            return self.min_iterations if budget <= 0 else None
+        if budget * self.iterations_per_second < self.min_iterations:
+            return self.min_iterations
+        return None
+
+    def record(self, iterations: int, seconds: float) -> None:
+        """Update the measured speed with the iterations of a search, averaging it with the previous ones."""
+        if not iterations or seconds <= 0:
+            return
+        speed = iterations / seconds
+        if self.iterations_per_second is None:
+            self.iterations_per_second = speed
+        else:
+            self.iterations_per_second = .5 * (self.iterations_per_second + speed)
@@ -3,34 +3,49 @@ from collections import defaultdict
 from typing import Dict, List, Optional, Tuple
 from copy import deepcopy
 import numpy as np
-from core.player import Color
-from faronona.faronona_player import FarononaPlayer
-from faronona.faronona_rules import FarononaRules
+from faronona.faronona_rules import FarononaRules, COMBO_PLAYERS
 from faronona.faronona_state import FarononaState
-from faronona.faronona_action import FarononaAction, FarononaActionType
+from faronona.faronona_action import FarononaAction
+from .playout import get_playout
 
 
 class Node:
-    def __init__(self, agent: int, state: FarononaState, parent: Tuple = (None, None)) -> None:
+    def __init__(self, agent: int, state: FarononaState, parent: Tuple = (None, None), macro: bool = False,
+                 rng: Optional[np.random.RandomState] = None) -> None:
         """Constructor of Tree Node.
 
         Args:
             agent (int): integer position of the IA Agent.
-            state (FarononaState): Game state.
+            state (FarononaState): Game state. The node takes it over: the caller gives a copy if it keeps using it.
             parent (Optional[Tuple[FarononaAction, Node]]): Parent node and action played to reach it.
                                                             Defaults to None.
+            macro (bool): Branch on whole turns (FarononaRules.get_capture_sequences) instead of single moves. The
+                          actions of the tree are then tuples of FarononaAction. Defaults to False.
+            rng (np.random.RandomState, optional): If given, the untried actions of the node and of its children are
+                                                   shuffled with it, so trees grown with different seeds expand in
+                                                   different orders. Defaults to None.
         """
         self.agent = agent
-        self.state = deepcopy(state)
+        self.macro = macro
+        self.rng = rng
+        self.state = state
         self.parent: Optional[Tuple[FarononaAction, Node]] = parent
         self.children: List[Node] = []
+        self.actions: List[FarononaAction] = []  # actions[i] leads to children[i]
         self._number_of_visits: int = 0
         self._results: Dict[int, int] = defaultdict(lambda: 0)
+        self._amaf: Dict[int, List] = {}  # action code -> [visits, q], the All-Moves-As-First statistics
         self._untried_actions: List[FarononaAction] = self.untried_actions()
 
     def untried_actions(self):
         """Return all possible actions in current state."""
-        self._untried_actions, _ = self.get_possible_actions(self.state, self.current_player)
+        if self.macro:
+            sequences = FarononaRules.get_capture_sequences(self.state, self.current_player)
+            self._untried_actions = [actions for actions, _ in sequences]
+        else:
+            self._untried_actions, _ = self.get_possible_actions(self.state, self.current_player)
+        if self.rng is not None:
+            self.rng.shuffle(self._untried_actions)
         return self._untried_actions
 
     @property
@@ -45,39 +60,74 @@ class Node:
         """Returns number of time this node has been visited."""
         return self._number_of_visits
 
-    def expand(self):
-        """Expand the tree by playing an untried action."""
+    def expand(self, table=None):
+        """Expand the tree by playing an untried action.
+
+        Args:
+            table (TranspositionTable, optional): If given, a position already in the table is not created again:
+                                                  its node becomes a child of this one too. Defaults to None.
+        """
         action = self._untried_actions.pop()
-        next_state, _ = self.move(self.state, action, self.current_player)
-        child_node = Node(self.agent, next_state, parent=(action, self))
+        if self.macro:
+            next_state = self.move_sequence(self.state, action, self.current_player)
+        else:
+            next_state = self.move(self.state, action, self.current_player)
+        child_node = None
+        if table is not None:
+            child_node = table.get(next_state.get_hash())
+        if child_node is None:
+            child_node = Node(self.agent, next_state, parent=(action, self), macro=self.macro, rng=self.rng)
+            if table is not None:
+                table.put(next_state.get_hash(), child_node)
         self.children.append(child_node)
+        self.actions.append(action)
         return child_node 
 
+    def find_descendant(self, position: int, max_depth: int = 2):
+        """Search the expanded subtree, level by level, for the node of a position.
+
+        Args:
+            position (int): The hash of the position (FarononaState.get_hash).
+            max_depth (int, optional): Number of levels to look into. Defaults to 2, the replies to the replies.
+
+        Returns:
+            Node: The closest node of the position, None if it is not in the subtree.
+        """
+        level = [self]
+        for _ in range(max_depth):
+            level = [child for node in level for child in node.children]
+            for node in level:
+                if node.state.get_hash() == position:
+                    return node
+        return None
+
+    def get_child_action(self, child):
+        """Return the action leading from this node to one of its children."""
+        return self.actions[self.children.index(child)]
+
     def is_terminal_node(self):
         """Is game finished ?"""
         if self.state.get_latest_player() is None:
             return False
         return FarononaRules.is_end_game(self.state)
 
-    def rollout(self, max_depth: int = float('inf')) -> int:
+    def rollout(self, max_depth: int = float('inf'), moves: List = None, evaluator=None, tablebase=None) -> int:
         """Simulate entire game randomly from this note state.
 
+        Args:
+            max_depth (int): Maximum number of plies simulated. Defaults to the end of the game.
+            moves (List, optional): If given, receives the (player, action code) of each simulated ply.
+            evaluator (FarononaEvaluator, optional): Scores the game when max_depth stops it before its end, instead
+                                                     of its current score.
+            tablebase (EndgameTablebase, optional): Gives the exact result of the positions it holds instead of
+                                                    simulating on.
+
         Returns:
             int: Game result. 0 for tie, 1 for victory and -1 for loss.
         """
-        current_state = deepcopy(self.state)
-        current_player = self.current_player
-        
-        depth = max_depth
-        while depth and not FarononaRules.is_end_game(current_state):
-            possible_moves, scores = self.get_possible_actions(current_state, current_player)
-            action = self.rollout_policy_v2(possible_moves, scores)
-            # action = self.rollout_policy_v1(possible_moves)
-            current_state, _ = self.move(current_state, action, current_player)
-            current_player = current_state.get_next_player()
-            depth -= 1
-
-        return current_state.score
+        # The simulation runs on the node state itself and is undone before returning. Its moves are the ones
+        # rollout_policy_v2 picks among get_possible_actions.
+        return get_playout(self.state.get_board().board_shape).run(self.state, max_depth, moves, evaluator, tablebase)
 
     def rollout_policy_v1(self, possible_moves: List[FarononaAction]) -> FarononaAction:
         """Rollout move selection policy, currently random."""
@@ -88,11 +138,35 @@ class Node:
         idx_max = np.argmax(scores)
         return possible_moves[idx_max]
 
-    def backpropagate(self, score):
-        """Backrpropagation of rollout simulation."""
+    def update(self, score):
+        """Add a rollout result to the node statistics."""
         self._number_of_visits += 1.
         self._results[-1] += score[-1] # value backed up.
         self._results[1] += score[1]
+
+    def update_amaf(self, codes, score):
+        """Add a rollout result to the AMAF statistics of the actions the player of this node played in it."""
+        q = score[self.agent] - score[-1 * self.agent]
+        for code in codes:
+            entry = self._amaf.get(code)
+            if entry is None:
+                self._amaf[code] = [1, q]
+            else:
+                entry[0] += 1
+                entry[1] += q
+
+    def add_virtual_loss(self, loss):
+        """Count a pending rollout as a loss of the agent, so other selections of the same batch avoid the node."""
+        self._number_of_visits += 1.
+        self._results[-1 * self.agent] += loss
+
+    def remove_virtual_loss(self, loss):
+        self._number_of_visits -= 1.
+        self._results[-1 * self.agent] -= loss
+
+    def backpropagate(self, score):
+        """Backrpropagation of rollout simulation."""
+        self.update(score)
         _, parent = self.parent
         if parent:
             parent.backpropagate(score)
@@ -100,16 +174,34 @@ class Node:
     def is_fully_expanded(self):
         return len(self._untried_actions) == 0
 
-    def best_child(self, epsilon=0.9):
+    def best_child(self, epsilon=0.9, rave=None):
         """Return child with the greater Upper Confidence Bounds.
 
         Args:
             epsilon (float, optional): The exploration factor. Defaults to 0.9.
+            rave (float, optional): RAVE equivalence parameter. If given, the value of a child is blended with the
+                                    AMAF value of its action, with the weight sqrt(rave / (3 n + rave)) decaying
+                                    as the child is visited. Defaults to None.
+
+        A child never visited has no value yet and is returned first.
 
         Returns:
             Node: The best child.
         """
-        choices_weights = [(c.q / c.n) + epsilon * np.sqrt((2 * np.log(self.n) / c.n)) for c in self.children]
+        count = len(self.children)
+        if count == 1:
+            return self.children[0]
+        n = np.fromiter((c.n for c in self.children), dtype=np.float64, count=count)
+        unvisited = np.flatnonzero(n == 0)
+        if len(unvisited):
+            return self.children[unvisited[0]]
+        q = np.fromiter((c.q for c in self.children), dtype=np.float64, count=count)
+        value = q / n
+        if rave is not None:
+            amaf = np.array([self._amaf.get(action.code, (0, 0.)) for action in self.actions], dtype=np.float64)
+            beta = np.sqrt(rave / (3 * n + rave))
+            value = np.where(amaf[:, 0] > 0, (1 - beta) * value + beta * amaf[:, 1] / np.maximum(amaf[:, 0], 1), value)
+        choices_weights = value + epsilon * np.sqrt(2 * np.log(self.n) / n)
         return self.children[np.argmax(choices_weights)]
 
 
@@ -120,33 +212,34 @@ class Node:
     #################
 
     def move(self, state: FarononaState, action: FarononaAction, player: int) -> FarononaState:
+        """Play one of the untried actions, legal by construction, on a copy of the state."""
         _state = deepcopy(state)
-        _state, done = FarononaRules.act(_state, action, player)
+        FarononaRules.make_move(_state, action, player)
         FarononaRules.moment_player(_state, self.players)
-        return _state, done
-        
+        return _state
+
+    def move_sequence(self, state: FarononaState, actions: Tuple[FarononaAction], player: int) -> FarononaState:
+        """Play a whole turn given by FarononaRules.get_capture_sequences on a copy of the state."""
+        _state = deepcopy(state)
+        for action in actions:
+            FarononaRules.make_move(_state, action, player)
+            FarononaRules.moment_player(_state, self.players)
+        return _state
+
     @property
     def players(self):
-        players = {}
-        players[-1] = FarononaPlayer("-1", Color(-1))
-        players[1] = FarononaPlayer("1", Color(1))
-        return players
+        return COMBO_PLAYERS
 
     @property
     def current_player(self):
         return self.state.get_next_player()
 
     def get_possible_actions(self, state: FarononaState, player: int) -> List[FarononaAction]:
-        possible_actions = []
-        scores = []
-        actions = FarononaRules.get_player_actions(state, player)
-        if actions is None:
+        scored_actions = FarononaRules.get_scored_actions(state, player)
+        if scored_actions is None:
             print("Debug")
-
-        for action in actions:
-            _win_actions, _win_scores = self.get_win_strategy_actions(state, action, player)
-            possible_actions.extend(_win_actions)
-            scores.extend(_win_scores)
+        possible_actions = [action for action, _ in scored_actions]
+        scores = [score for _, score in scored_actions]
 
         if np.any(scores): 
             # Tere is at least one non zero element
@@ -160,35 +253,3 @@ class Node:
         if len(possible_actions) == 0:
             print("Debug")
         return list(possible_actions), list(scores)
-
-    def get_win_strategy_actions(self, state: FarononaState, action: FarononaAction, player: int) -> List[Tuple[FarononaAction, int]]:
-        """Given an action return the opposition win strategy's action if it is a win.
-        None if opposite is not a win.
-        
-        List[Actions], List[int]
-        (action, 0) if not a win move
-        """
-        actions = []
-        scores = []
-        action_dict = action.get_action_as_dict()
-        at, to = action_dict['action']['at'], action_dict['action']['to']
-
-        #check if it is a win move for approach
-        approach_captures = FarononaRules.is_win_approach_move(at, to, state, player)
-        if (approach_captures is not None) and len(approach_captures) != 0:
-            actions.append(FarononaAction(action_type=FarononaActionType.MOVE, win_by='APPROACH', at=at, to=to))
-            scores.append(len(approach_captures))
-        
-        #check if it is a win move for remote
-        remote_captures = FarononaRules.is_win_remote_move(at, to, state, player)
-        if (remote_captures is not None)  and len(remote_captures) != 0:
-            actions.append(FarononaAction(action_type=FarononaActionType.MOVE, win_by='REMOTE', at=at, to=to))
-            scores.append(len(remote_captures))
-
-        if not actions:
-            actions.append(action)
-            scores.append(0)
-
-        assert len(actions) == len(scores), "Bad assignments."
-
-        return actions, scores
@@ -0,0 +1,94 @@
+"""Playout kernel of the MCTS rollouts."""
+import threading
+from faronona.faronona_action import FarononaAction, get_action_space
+from faronona.faronona_rules import FarononaRules, COMBO_PLAYERS
+from faronona.faronona_state import FarononaState
+
+
+class Playout(object):
+    """Greedy game simulation run in place on a scratch state.
+
+    The moves are played with make_move and undone at the end, the actions are the prebuilt ones of the action
+    space and the undo records are kept in a buffer reused from one playout to the next, so a ply creates no state,
+    action or player. A Playout must not run two simulations at the same time.
+    """
+
+    def __init__(self, board_shape) -> None:
+        """Initializer for the playout.
+
+        Args:
+            board_shape ((int, int)): The board shape of the simulated states.
+        """
+        self.space = get_action_space(board_shape)
+        self._history = []
+
+    def choose_action(self, state: FarononaState, player: int) -> FarononaAction:
+        """Pick the move of Node.rollout_policy_v2 over Node.get_possible_actions: the first capturing action,
+        APPROACH before REMOTE, or the first move when none captures."""
+        at, to, approach, remote = FarononaRules.analyse_moves(state, player)[0]
+        if remote and not approach:
+            return self.space.get_action(at, to, 'REMOTE')
+        return self.space.get_action(at, to)
+
+    def run(self, state: FarononaState, max_depth: int = float('inf'), moves=None, evaluator=None, tablebase=None):
+        """Simulate the game from a state, which is given back unchanged.
+
+        Args:
+            state (FarononaState): The state to start from.
+            max_depth (int, optional): Maximum number of plies. Defaults to the end of the game.
+            moves (List, optional): If given, the (player, action code) of each ply are appended to it.
+            evaluator (FarononaEvaluator, optional): If given, a game stopped by max_depth before its end is scored
+                                                     with its estimate_score. Defaults to None.
+            tablebase (EndgameTablebase, optional): If given, the simulation stops at the first position of the
+                                                    table, scored with its exact result. Defaults to None.
+
+        Returns:
+            Dict[int, float]: The score of each player when the simulation stops.
+        """
+        history = self._history
+        ply = 0
+        exact = None
+        try:
+            while ply < max_depth and not FarononaRules.is_end_game(state):
+                if tablebase is not None:
+                    exact = tablebase.get_score(state)
+                    if exact is not None:
+                        break
+                player = state.get_next_player()
+                action = self.choose_action(state, player)
+                undo = FarononaRules.make_move(state, action, player)
+                if ply < len(history):
+                    history[ply] = undo
+                else:
+                    history.append(undo)
+                ply += 1
+                if moves is not None:
+                    moves.append((player, action.code))
+                FarononaRules.moment_player(state, COMBO_PLAYERS)
+            if exact is not None:
+                score = exact
+            elif evaluator is not None and ply >= max_depth and not FarononaRules.is_end_game(state):
+                score = evaluator.estimate_score(state)
+            else:
+                score = dict(state.score)
+        finally:
+            while ply:
+                ply -= 1
+                FarononaRules.unmake_move(state, history[ply])
+        return score
+
+
+# Playouts of each thread, by board shape: a pondering agent runs rollouts in the background while the other player
+# searches.
+_local = threading.local()
+
+
+def get_playout(board_shape):
+    """Give the Playout of a board shape for the calling thread, built on its first call there."""
+    playouts = getattr(_local, 'playouts', None)
+    if playouts is None:
+        playouts = _local.playouts = {}
+    playout = playouts.get(board_shape)
+    if playout is None:
+        playout = playouts[board_shape] = Playout(board_shape)
+    return playout
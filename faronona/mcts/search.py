@@ -1,50 +1,320 @@
 """Monte Carlo Tree Search Root Node.
 """
 
+import atexit
+import multiprocessing
 import time
-from faronona.faronona_action import FarononaAction
+import numpy as np
+from faronona.faronona_action import FarononaAction, get_action_space
+from faronona.faronona_eval import FarononaEvaluator
+from .batch_playout import get_batch_playout
 from .node import Node
+from .playout import get_playout
+from .transposition import TranspositionTable
+
+# Worker pools of the root-parallel mode, by number of processes. They are kept for the whole game.
+_worker_pools = {}
+
+
+def get_worker_pool(n_workers: int):
+    """Give the persistent pool of n_workers processes, started on the first call."""
+    pool = _worker_pools.get(n_workers)
+    if pool is None:
+        pool = _worker_pools[n_workers] = multiprocessing.Pool(n_workers)
+    return pool
+
+
+def close_worker_pools() -> None:
+    """Stop the processes of every worker pool."""
+    for pool in _worker_pools.values():
+        pool.terminate()
+        pool.join()
+    _worker_pools.clear()
+
+
+# The pools outlive the searches: stop their processes when the game process exits.
+atexit.register(close_worker_pools)
+
+
+def _grow_tree(job):
+    """Worker side of the root-parallel mode: grow a tree from the root state and give its root-child statistics.
+
+    Returns:
+        Tuple[int, List]: The root visits and, for each root child, the code of its action (a tuple of codes for
+                          macro actions), its visits and its q value.
+    """
+    agent, state, macro, seed, n_iterations, end_time, transpositions, config = job
+    np.random.seed(seed)
+    root = Node(agent, state, macro=macro, rng=np.random.RandomState(seed))
+    search = Search(root, **config)
+    time_iterations = None if end_time is None else end_time - time.time()
+    search.run(n_iterations, time_iterations, transpositions)
+
+    space = get_action_space(state.get_board().board_shape)
+    stats = []
+    for action, child in zip(root.actions, root.children):
+        code = tuple(space.encode(a) for a in action) if macro else space.encode(action)
+        stats.append((code, child.n, child.q))
+    return root.n, stats
+
+
+def _simulate(state, max_depth, evaluator, tablebase, playouts_per_leaf, moves=None):
+    """Score a leaf state with a rollout, or with the mean of a batch of playouts whose moves are not recorded."""
+    board_shape = state.get_board().board_shape
+    if playouts_per_leaf > 1:
+        return get_batch_playout(board_shape).mean_score(state, playouts_per_leaf, max_depth=max_depth)
+    return get_playout(board_shape).run(state, max_depth, moves, evaluator, tablebase)
+
+
+def _rollout(job):
+    """Worker side of the leaf-parallel mode: simulate a game from a leaf state."""
+    return _simulate(*job)
 
 
 class Search(object):
     """MTCS entry point."""
 
-    def __init__(self, node: Node, max_rollout_depth: int = float('inf')) -> None:
+    def __init__(self, node: Node, max_rollout_depth: int = float('inf'), table_size: int = 100000,
+                 virtual_loss: int = 22, playouts_per_leaf: int = 1, rave: bool = False,
+                 rave_equivalence: float = 1000., evaluator: FarononaEvaluator = None, tablebase=None) -> None:
         """Initializer for search.
 
         Args:
             node (Node): Root node.
             max_rollout_depth (int): Maximum depth to look into future during rollout. Defauls to end of game.
+            table_size (int): Maximum number of positions in the transposition table. Defaults to 100000.
+            virtual_loss (int): Score counted against the agent on the path of a pending rollout in the
+                                leaf-parallel mode. Defaults to 22, the score of a game where every piece is lost.
+            playouts_per_leaf (int): With more than one, a leaf is scored by the mean of that many random playouts
+                                     run at once by BatchPlayout.mean_score instead of a single Node.rollout, in
+                                     the leaf-parallel workers too. 64 playouts cost about 8 to 13 rollouts.
+                                     Defaults to 1.
+            rave (bool): Record for the nodes of each selected path the All-Moves-As-First statistics of the actions
+                         played after them, in the tree and in the rollout, and blend them into the UCB of the
+                         children. Single moves only. Defaults to False.
+            rave_equivalence (float): Number of visits of a child for which its own value and the AMAF one weigh
+                                      the same. Defaults to 1000.
+            evaluator (FarononaEvaluator): Scores the rollouts stopped by max_rollout_depth before the end of the
+                                           game. Defaults to a FarononaEvaluator with its default weights.
+            tablebase (EndgameTablebase): If given, a rollout reaching a position of the table stops there with its
+                                          exact result. Not used by the batches of playouts. Defaults to None.
         """
         self.root = node
         self.max_rollout_depth = max_rollout_depth
+        self.table_size = table_size
+        self.virtual_loss = virtual_loss
+        self.playouts_per_leaf = playouts_per_leaf
+        assert not (rave and node.macro), "RAVE needs single move actions"
+        self.rave = rave
+        self.rave_equivalence = rave_equivalence
+        self.evaluator = evaluator if evaluator is not None else FarononaEvaluator()
+        self.tablebase = tablebase
+        self.table = None
+        self.rollouts_saved = 0
+        self.rollouts = 0
+        self.search_time = 0.
+
+    def get_config(self):
+        """Give the keyword arguments to build a Search configured like this one, as the workers do."""
+        return {'max_rollout_depth': self.max_rollout_depth, 'table_size': self.table_size,
+                'virtual_loss': self.virtual_loss, 'playouts_per_leaf': self.playouts_per_leaf, 'rave': self.rave,
+                'rave_equivalence': self.rave_equivalence, 'evaluator': self.evaluator, 'tablebase': self.tablebase}
 
-    def best_action(self, n_iterations: int = None, time_iterations: float = None, epsilon: float = .1) -> FarononaAction:
+    def best_action(self, n_iterations: int = None, time_iterations: float = None, epsilon: float = .1,
+                    transpositions: bool = False, n_workers: int = 1, leaf_batch: int = 1) -> FarononaAction:
         """Search the best action to make.
 
         Args:
             n_simulation (int, optional): [description]. Defaults to None.
             time_simulation (float, optional): [description]. Defaults to None.
+            transpositions (bool, optional): Share the nodes of the positions reached by different move orders
+                                             through a transposition table. Defaults to False.
+            n_workers (int, optional): Root parallelization. With more than one worker, each process of a
+                                       persistent pool grows its own tree from the root state with a different
+                                       seed, within the same iteration or time budget, and the statistics of the
+                                       root children are merged to pick the action. Defaults to 1.
+            leaf_batch (int, optional): Leaf parallelization. With a batch of more than one leaf, the tree is
+                                        shared: each step selects leaf_batch leaves under virtual loss, runs their
+                                        rollouts at once in the pool of n_workers processes and backs the results
+                                        up together. Defaults to 1.
         """
-        if n_iterations is None :
+        if n_workers > 1 and leaf_batch == 1:
+            action = self._root_parallel_action(n_iterations, time_iterations, epsilon, transpositions, n_workers)
+        else:
+            self.run(n_iterations, time_iterations, transpositions, n_workers, leaf_batch)
+            # to select best child go for exploitation only
+            best_child = self.root.best_child(epsilon=epsilon, rave=self._rave())
+            action = self.root.get_child_action(best_child)
+        if self.root.macro:
+            # Play the first move of the turn, the next ones are searched again on the following calls.
+            return action[0]
+        return action
+
+    def run(self, n_iterations: int = None, time_iterations: float = None, transpositions: bool = False,
+            n_workers: int = 1, leaf_batch: int = 1) -> None:
+        """Grow the tree for a number of iterations or a duration in seconds. An iteration is a rollout, so a
+        batch of leaves counts for leaf_batch iterations."""
+        if transpositions and self.table is None:
+            self.table = TranspositionTable(self.table_size)
+            self.table.put(self.root.state.get_hash(), self.root)
+        start_time = time.time()
+        if leaf_batch > 1:
+            pool = get_worker_pool(n_workers) if n_workers > 1 else None
+            if n_iterations is None:
+                assert(time_iterations is not None)
+                end_time = start_time + time_iterations
+                while time.time() < end_time:
+                    self.run_batch(leaf_batch, pool)
+            else:
+                for done in range(0, n_iterations, leaf_batch):
+                    self.run_batch(min(leaf_batch, n_iterations - done), pool)
+        elif n_iterations is None :
             assert(time_iterations is not None)
-            end_time = time.time() + time_iterations
+            end_time = start_time + time_iterations
             while time.time() < end_time:
                 self.run_iteration()
         else:
             for _ in range(n_iterations):            
                 self.run_iteration()
-        # to select best child go for exploitation only
-        best_child = self.root.best_child(epsilon=epsilon)
-        action, _ = best_child.parent
-        return action
+        self.search_time += time.time() - start_time
+
+    def _root_parallel_action(self, n_iterations, time_iterations, epsilon, transpositions, n_workers):
+        """Grow one tree per worker and pick the root child with the best merged Upper Confidence Bound."""
+        root = self.root
+        if n_iterations is None:
+            assert(time_iterations is not None)
+            end_time = time.time() + time_iterations
+        else:
+            end_time = None
+        seeds = np.random.randint(0, 2 ** 31 - 1, size=n_workers)
+        config = self.get_config()
+        jobs = [(root.agent, root.state, root.macro, int(seed), n_iterations, end_time, transpositions, config)
+                for seed in seeds]
+        start_time = time.time()
+        results = get_worker_pool(n_workers).map(_grow_tree, jobs)
+        self.search_time += time.time() - start_time
+
+        total_n = 0
+        merged = {}  # action code -> [visits, q]
+        for n, stats in results:
+            total_n += n
+            # Each worker visits its root once per rollout.
+            self.rollouts += int(n)
+            for code, child_n, child_q in stats:
+                entry = merged.setdefault(code, [0, 0])
+                entry[0] += child_n
+                entry[1] += child_q
+        codes = [code for code, (n, _) in merged.items() if n]
+        weights = [(merged[c][1] / merged[c][0]) + epsilon * np.sqrt((2 * np.log(total_n) / merged[c][0]))
+                   for c in codes]
+        code = codes[np.argmax(weights)]
+
+        space = get_action_space(root.state.get_board().board_shape)
+        if root.macro:
+            return tuple(space.decode(c) for c in code)
+        return space.decode(code)
 
     def run_iteration(self):
         """Run a single iteration."""
+        self.rollouts += 1
+        if self.rave:
+            path, moves = self._select_path(), []
+            reward = self.simulate(path[-1], moves)
+            for node in path:
+                node.update(reward)
+            self._update_amaf(path, moves, reward)
+            return
+        if self.table is not None:
+            path = self._transposition_tree_policy()
+            reward = self.simulate(path[-1])
+            for node in path:
+                node.update(reward)
+            return
         v = self._tree_policy()
-        reward = v.rollout(max_depth=self.max_rollout_depth)
+        reward = self.simulate(v)
         v.backpropagate(reward)
 
+    def simulate(self, node: Node, moves=None):
+        """Score a leaf with a rollout, or with the mean of a batch of playouts whose moves are not recorded."""
+        return _simulate(node.state, self.max_rollout_depth, self.evaluator, self.tablebase, self.playouts_per_leaf,
+                         moves)
+
+    def run_batch(self, size: int, pool=None) -> None:
+        """Run the rollouts of several leaves at once.
+
+        Args:
+            size (int): Number of leaves to select.
+            pool (multiprocessing.Pool, optional): Pool running the rollouts. They run one after the other in this
+                                                   process if None. Defaults to None.
+        """
+        paths = []
+        for _ in range(size):
+            path = self._select_path()
+            for node in path:
+                node.add_virtual_loss(self.virtual_loss)
+            paths.append(path)
+        if pool is None:
+            rewards = [self.simulate(path[-1]) for path in paths]
+        else:
+            rewards = pool.map(_rollout, [(path[-1].state, self.max_rollout_depth, self.evaluator, self.tablebase,
+                                           self.playouts_per_leaf) for path in paths])
+        for path, reward in zip(paths, rewards):
+            for node in path:
+                node.remove_virtual_loss(self.virtual_loss)
+                node.update(reward)
+            if self.rave:
+                self._update_amaf(path, [], reward)
+        self.rollouts += size
+
+    def ponder(self, stop, max_iterations: int = None) -> None:
+        """Grow the tree until an event is set, from a background thread while the opponent plays. Nothing else may
+        use the tree before the thread is joined: the rollouts are played on the node states in place.
+
+        Args:
+            stop (threading.Event): Set to end the search once the iteration going on is over.
+            max_iterations (int, optional): Iterations after which the search ends anyway. Defaults to None.
+        """
+        start_time = time.time()
+        iterations = 0
+        while not stop.is_set() and (max_iterations is None or iterations < max_iterations):
+            self.run_iteration()
+            iterations += 1
+        self.search_time += time.time() - start_time
+
+    def rollout_stats(self):
+        """Report the number of rollouts run so far, the time spent growing the tree and the effective rollouts per
+        second."""
+        return {'rollouts': self.rollouts, 'seconds': self.search_time,
+                'rollouts_per_second': self.rollouts / self.search_time if self.search_time else 0.}
+
+    def rave_stats(self):
+        """Report the RAVE blending at the root.
+
+        Returns:
+            Dict: The equivalence parameter and the mean, min and max weight of the AMAF values in the value of the
+            root children. None if RAVE is off.
+        """
+        if not self.rave:
+            return None
+        n = np.array([child.n for child in self.root.children], dtype=np.float64)
+        if not len(n):
+            return {'equivalence': self.rave_equivalence, 'blend': 1., 'min_blend': 1., 'max_blend': 1.}
+        beta = np.sqrt(self.rave_equivalence / (3 * n + self.rave_equivalence))
+        return {'equivalence': self.rave_equivalence, 'blend': float(beta.mean()), 'min_blend': float(beta.min()),
+                'max_blend': float(beta.max())}
+
+    def table_stats(self):
+        """Report the transposition table usage.
+
+        Returns:
+            Dict: The table hits, misses, hit rate, evictions and size, along with the number of rollouts saved by
+            going through an already visited position instead of simulating from it. None if the table is off.
+        """
+        if self.table is None:
+            return None
+        return {'hits': self.table.hits, 'misses': self.table.misses, 'hit_rate': self.table.hit_rate,
+                'evictions': self.table.evictions, 'size': len(self.table), 'rollouts_saved': self.rollouts_saved}
+
     def _tree_policy(self):
         """Select node to run rollout."""
         current_node: Node = self.root
@@ -52,5 +322,54 @@ class Search(object):
             if not current_node.is_fully_expanded():
                 return current_node.expand()
             else:
-                current_node = current_node.best_child()
+                current_node = current_node.best_child(rave=self._rave())
         return current_node
+
+    def _rave(self):
+        return self.rave_equivalence if self.rave else None
+
+    def _update_amaf(self, path, moves, reward):
+        """Give each node of the path the AMAF result of the actions its player played after it."""
+        played = {-1: set(), 1: set()}
+        for player, code in moves:
+            played[player].add(code)
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            if i < len(path) - 1:
+                played[node.current_player].add(node.get_child_action(path[i + 1]).code)
+            node.update_amaf(played[node.current_player], reward)
+
+    def _select_path(self):
+        """Select the node to run rollout from, along with the nodes to back the result up to."""
+        if self.table is not None:
+            return self._transposition_tree_policy()
+        path = [self._tree_policy()]
+        while path[-1].parent[1] is not None:
+            path.append(path[-1].parent[1])
+        path.reverse()
+        return path
+
+    def _transposition_tree_policy(self):
+        """Select the path to the node to run rollout from when nodes are shared through the table.
+
+        A node can have several parents, so the statistics are backed up along the selected path instead of the
+        parent links. When an expansion reaches a position already visited, the selection goes on through it
+        instead of simulating again from there.
+        """
+        current_node: Node = self.root
+        path = [current_node]
+        while not current_node.is_terminal_node():
+            if not current_node.is_fully_expanded():
+                child = current_node.expand(self.table)
+                if child.n == 0:
+                    path.append(child)
+                    return path
+                self.rollouts_saved += 1
+            else:
+                child = current_node.best_child(rave=self._rave())
+            if child in path:
+                # The position repeats along the path (moves without capture), stop there.
+                break
+            path.append(child)
+            current_node = child
+        return path
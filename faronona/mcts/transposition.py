@@ -0,0 +1,47 @@
+"""Transposition table of the MCTS nodes."""
+from collections import OrderedDict
+
+
+class TranspositionTable(object):
+    """Bounded map from position hashes to tree nodes, evicting the least recently used entry when full."""
+
+    def __init__(self, max_size: int = 100000) -> None:
+        """Initializer for the table.
+
+        Args:
+            max_size (int): Maximum number of positions kept. Defaults to 100000.
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: int):
+        """Return the node stored for a position, None if it is not in the table."""
+        node = self._entries.get(key)
+        if node is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return node
+
+    def put(self, key: int, node) -> None:
+        """Store the node of a position, evicting the least recently used one if the table is full."""
+        self._entries[key] = node
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
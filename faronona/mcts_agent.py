@@ -1,5 +1,11 @@
+import os
+import threading
+from copy import deepcopy
+from faronona.faronona_book import OpeningBook
 from faronona.faronona_player import FarononaPlayer
-from mcts import Node, Search
+from faronona.faronona_rules import FarononaRules, COMBO_PLAYERS
+from faronona.faronona_tablebase import EndgameTablebase
+from mcts import Node, Search, TimeManager
 
 
 class AI(FarononaPlayer):
@@ -8,19 +14,95 @@ class AI(FarononaPlayer):
 
     # MCTS Parameters
     EPSILON = .1
-    MAX_ROLLOUT_DEPTH = float('inf')
-    N_ITERATIONS = 15
+    MAX_ROLLOUT_DEPTH = float('inf')  # finite to cut the rollouts and score them with FarononaEvaluator
+    N_ITERATIONS = 15  # iterations per move when the clock is not used
+    USE_CLOCK = True  # share the remaining time between the estimated moves left instead of N_ITERATIONS
+    MACRO_MOVES = False  # branch on whole capture sequences instead of single moves
+    N_WORKERS = 1  # processes growing root-parallel trees, 1 to search in the game process
+    LEAF_BATCH = 1  # leaves whose rollouts run at once in the N_WORKERS processes, 1 for root parallelization
+    RAVE = False  # blend All-Moves-As-First statistics into the UCB of the children
+    BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')  # used if it exists
+    TABLEBASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'endgame_tablebase.bin')  # idem
+    REUSE_DEPTH = 4  # levels of the previous tree searched for the incoming position, 0 to always start afresh
+    PONDER = False  # keep growing the tree in a background thread during the opponent's turn, needs REUSE_DEPTH
+    PONDER_ITERATIONS = 50000  # most iterations of a pondering session, to bound the size of the tree
 
     def __init__(self, color):
         super(AI, self).__init__(self.name, color)
         self.position = color.value
-        
+        self.root = None  # root of the previous search, kept to reuse its subtree
+        self.clock = TimeManager()
+        self.book = OpeningBook(self.BOOK_PATH) if self.BOOK_PATH and os.path.exists(self.BOOK_PATH) else None
+        self.tablebase = EndgameTablebase(self.TABLEBASE_PATH) \
+            if self.TABLEBASE_PATH and os.path.exists(self.TABLEBASE_PATH) else None
+        self._ponder_thread = None
+        self._ponder_stop = threading.Event()
 
     def play(self, state, remain_time):
-        # TODO: Manage remaining time
-        root = Node(self.position, state)
-        search_tree = Search(root, max_rollout_depth=self.MAX_ROLLOUT_DEPTH)
-        action = search_tree.best_action(n_iterations=self.N_ITERATIONS, epsilon=self.EPSILON)
+        # Our clock is running: the pondering ends before anything else.
+        self.stop_pondering()
+        if self.book is not None:
+            action = self.book.get_action(state)
+            if action is not None:
+                return action
+        if self.tablebase is not None:
+            action = self.tablebase.get_action(state)
+            if action is not None:
+                return action
+        root = self.get_reused_root(state)
+        if root is None:
+            root = Node(self.position, deepcopy(state), macro=self.MACRO_MOVES)
+        self.root = root
+        search_tree = Search(root, max_rollout_depth=self.MAX_ROLLOUT_DEPTH, rave=self.RAVE, tablebase=self.tablebase)
+        n_iterations, time_iterations = self.N_ITERATIONS, None
+        if self.USE_CLOCK:
+            time_iterations = self.clock.get_budget(state, remain_time)
+            n_iterations = self.clock.get_iterations(time_iterations)
+        action = search_tree.best_action(n_iterations=n_iterations, time_iterations=time_iterations,
+                                         epsilon=self.EPSILON, n_workers=self.N_WORKERS, leaf_batch=self.LEAF_BATCH)
+        stats = search_tree.rollout_stats()
+        self.clock.record(stats['rollouts'], stats['seconds'])
+        # In the root-parallel mode the workers own the trees: there is no child to ponder on here.
+        if self.PONDER and not (self.N_WORKERS > 1 and self.LEAF_BATCH == 1):
+            self.start_pondering(state, action)
         return action
 
-    
+    def start_pondering(self, state, action):
+        """Search the position our action leads to in a background thread until the next play. Its node stays in
+        the tree, so get_reused_root finds the opponent's reply among its children. Nothing is searched when our
+        action ends the game.
+        """
+        undo = FarononaRules.make_move(state, action, self.position)
+        FarononaRules.moment_player(state, COMBO_PLAYERS)
+        position, done = state.get_hash(), FarononaRules.is_end_game(state)
+        FarononaRules.unmake_move(state, undo)
+        if done:
+            return
+        # A macro root has whole turns as children: the position after the first move of a turn is not one of them.
+        node = self.root.find_descendant(position, max_depth=1) or self.root
+        search_tree = Search(node, max_rollout_depth=self.MAX_ROLLOUT_DEPTH, rave=self.RAVE, tablebase=self.tablebase)
+        self._ponder_stop.clear()
+        self._ponder_thread = threading.Thread(target=search_tree.ponder,
+                                               args=(self._ponder_stop, self.PONDER_ITERATIONS), daemon=True)
+        self._ponder_thread.start()
+
+    def stop_pondering(self):
+        """Stop the pondering thread and wait for the end of its current iteration, so the tree and the rollouts
+        can be used again. Called by play and by the game runner at the end of a game. Does nothing if the agent
+        is not pondering."""
+        if self._ponder_thread is not None:
+            self._ponder_stop.set()
+            self._ponder_thread.join()
+            self._ponder_thread = None
+
+    def get_reused_root(self, state):
+        """Give the node of the incoming state in the tree of the previous move, detached from its parent with its
+        statistics intact. It is a child after a capture continuing our combo, a grandchild or deeper after the
+        opponent's reply. None if the position was not reached by the previous search.
+        """
+        if self.root is None:
+            return None
+        node = self.root.find_descendant(state.get_hash(), max_depth=self.REUSE_DEPTH)
+        if node is not None:
+            node.parent = (None, None)
+        return node
@@ -9,15 +9,16 @@ from core import Color
 
 
 class BoardGUI(QWidget):
-    def __init__(self, shape, current_player=-1, parent=None):
+    def __init__(self, shape, current_player=-1, board_class=Board, parent=None):
         super(BoardGUI, self).__init__(parent)
+        self.board_class = board_class
         self.current_player = current_player
         self.color = ["white", "green"]
         self.score = {-1: 0, 1: 0}
         self.shape = shape
         self.setFixedSize(100 * shape[1], 100 * shape[0])
         self.squares = list()
-        self._board = Board(shape)
+        self._board = board_class(shape)
         grid_layout = QGridLayout()
         grid_layout.setSpacing(0)
         for i in range(shape[0]):
@@ -78,7 +79,7 @@ class BoardGUI(QWidget):
         self.current_player = player
 
     def reset_board(self):
-        self._board = Board(self.shape)
+        self._board = self.board_class(self.shape)
         for i in range(self.shape[0]):
             for j in range(self.shape[1]):
                 self.squares[i][j].remove_piece()
@@ -12,6 +12,8 @@ from faronona import FarononaState
 from core import Color
 from faronona import FarononaRules
 from faronona import FarononaAction
+from faronona.faronona_bitboard import FarononaBitboard
+from core import Board
 from gui.div import Div
 from copy import deepcopy
 from utils.timer import Timer
@@ -25,7 +27,7 @@ class FarononaGUI(QMainWindow):
     automatic_save_game = False
 
     def __init__(self, app, shape, players, allowed_time=5.0, sleep_time=.500, first_player=-1, boring_limit=50,
-                 parent=None):
+                 bitboard=False, cache_size=None, parent=None):
         super(FarononaGUI, self).__init__(parent)
         self.app = app
 
@@ -46,12 +48,18 @@ class FarononaGUI(QMainWindow):
         self.sleep_time = sleep_time
         self.first_player = first_player
         self.just_stop = boring_limit
+        self.board_class = FarononaBitboard if bitboard else Board
+        # Moves are listed several times per step (end of game, combo, agent): compute them once per position. The
+        # cache is shared by the referee and the agents, so it is only safe when they all change the states through
+        # the rules (see FarononaRules.enable_cache): it is opt-in.
+        if cache_size:
+            FarononaRules.enable_cache(cache_size)
         self.setWindowTitle("[*] MAIC 2021 - Fanorona Game")
         self.statusBar()
         self.setWindowIcon(QtGui.QIcon("assets/icon.png"))
         layout = QHBoxLayout()
         layout.addStretch()
-        self.board_gui = BoardGUI(self.board_shape)
+        self.board_gui = BoardGUI(self.board_shape, board_class=self.board_class)
         layout.addWidget(self.board_gui)
         layout.addSpacing(15)
         self.panel = Panel([players[-1].name, players[1].name])
@@ -71,7 +79,7 @@ class FarononaGUI(QMainWindow):
 
         self.done = False
         self.rewarding_move = False
-        self.board = BoardGUI(self.board_shape)
+        self.board = BoardGUI(self.board_shape, board_class=self.board_class)
         self.board_gui.init_board(self.players) #
         self.state = FarononaState(board=self.board.get_board_state(), next_player=self.first_player,
                                boring_limit=self.just_stop)
@@ -156,7 +164,14 @@ class FarononaGUI(QMainWindow):
         else:
             pass
 
+    def _stop_pondering(self):
+        for player in self.players.values():
+            player.stop_pondering()
+
     def _reset_for_new_game(self):
+        self._stop_pondering()
+        if FarononaRules.cache is not None:
+            FarononaRules.cache.invalidate()
         self.board.reset_board()
         self.board.score = {-1: 0, 1: 0}
         self.done = False
@@ -226,6 +241,7 @@ class FarononaGUI(QMainWindow):
             self.players[turn].update_player_infos(self.get_player_info(turn))
             FarononaRules.moment_player(state, self.players)
             turn = self.state.get_next_player()
+        self._stop_pondering()
         self._update_gui()
         # TODO: Uncomment this lines above
         self._results()
@@ -25,11 +25,15 @@ if __name__ == '__main__':
     parser.add_argument('-ai0', help='path to the ai that will play as player 0')
     parser.add_argument('-ai1', help='path to the ai that will play as player 1')
     parser.add_argument('-s', help='time to show the board')
+    parser.add_argument('-b', action='store_true', help='use the bitboard rules backend')
+    parser.add_argument('-c', help='number of positions kept in the rules cache (the agents must only change the '
+                                   'states through the rules)')
     args = parser.parse_args()
 
     # set the time to play
     allowed_time = float(args.t) if args.t is not None else 5.0
     sleep_time = float(args.s) if args.s is not None else 0.
+    cache_size = int(args.c) if args.c is not None else None
 
     player_type = ['human', 'human']
     player_type[0] = args.ai0 if args.ai0 != None else 'human'
@@ -63,7 +67,10 @@ if __name__ == '__main__':
                         '-ai1 ai1_file.py\n'
                         '\t path to the ai that will play as player 1 \n'
                         '-s sleep time \n'
-                        '\t time(in second) to show the board(or move)')
-    game = FarononaGUI(app, (5, 9), agents, sleep_time=sleep_time, allowed_time=allowed_time)
+                        '\t time(in second) to show the board(or move) \n'
+                        '-c cache size \n'
+                        '\t number of positions kept in the rules cache')
+    game = FarononaGUI(app, (5, 9), agents, sleep_time=sleep_time, allowed_time=allowed_time,
+                       bitboard=args.b, cache_size=cache_size)
     game.show()
     sys.exit(app.exec_())